@@ -3,12 +3,20 @@ Analytics API endpoints for system statistics and insights
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, text
-from typing import Dict, Any, List
+from sqlalchemy import select, func, tuple_
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
+import asyncio
 
-from app.core.database import get_db
-from app.models.orm_models import User, Document, Workflow, ChatSession, ChatMessage
+from app.core.cache import (
+    stats_cache, health_cache, SYSTEM_STATS_KEY, GEMINI_HEALTH_KEY
+)
+from app.core.config import settings
+from app.core.database import get_db, fetch_all_concurrently, check_db_connection
+from app.models.orm_models import (
+    User, Document, Workflow, ChatSession, ChatMessage,
+    user_daily_doc_uploads, user_daily_messages
+)
 from app.models.schemas import (
     UserStatsResponse, SystemStatsResponse, BaseResponse
 )
@@ -16,49 +24,29 @@ from app.api.V1.auth import get_current_active_user
 
 router = APIRouter()
 
+def _stale_as_of(*row_sets) -> Optional[datetime]:
+    """When the materialized rollups behind these rows were last refreshed"""
+    refreshed = [row.refreshed_at for rows in row_sets for row in rows]
+    return max(refreshed) if refreshed else None
+
 @router.get("/user/stats", response_model=UserStatsResponse)
 async def get_user_statistics(
-    current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_active_user)
 ):
     """Get comprehensive user statistics"""
     
-    # Count documents
-    doc_result = await db.execute(
-        select(func.count(Document.id)).where(Document.owner_id == current_user.id)
-    )
-    total_documents = doc_result.scalar()
-    
-    # Count workflows
-    wf_result = await db.execute(
-        select(func.count(Workflow.id)).where(Workflow.owner_id == current_user.id)
-    )
-    total_workflows = wf_result.scalar()
-    
-    # Count chat sessions
-    chat_result = await db.execute(
-        select(func.count(ChatSession.id)).where(ChatSession.user_id == current_user.id)
-    )
-    total_chat_sessions = chat_result.scalar()
-    
-    # Calculate storage used
-    storage_result = await db.execute(
-        select(func.coalesce(func.sum(Document.file_size), 0)).where(Document.owner_id == current_user.id)
-    )
-    storage_used_bytes = storage_result.scalar()
-    
+    # Counters are maintained on the user row, which auth has already loaded
     return UserStatsResponse(
-        total_documents=total_documents,
-        total_workflows=total_workflows,
-        total_chat_sessions=total_chat_sessions,
-        storage_used_bytes=storage_used_bytes,
+        total_documents=current_user.document_count,
+        total_workflows=current_user.workflow_count,
+        total_chat_sessions=current_user.chat_session_count,
+        storage_used_bytes=current_user.total_storage_bytes,
         last_activity=current_user.last_login
     )
 
 @router.get("/user/activity", response_model=Dict[str, Any])
 async def get_user_activity(
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db),
     days: int = 30
 ):
     """Get user activity over the past N days"""
@@ -66,91 +54,95 @@ async def get_user_activity(
     start_date = datetime.utcnow() - timedelta(days=days)
     
     # Documents uploaded over time
-    doc_activity = await db.execute(
-        select(
-            func.date(Document.created_at).label('date'),
-            func.count(Document.id).label('count')
-        ).where(
-            Document.owner_id == current_user.id,
-            Document.created_at >= start_date
-        ).group_by(func.date(Document.created_at))
-        .order_by(func.date(Document.created_at))
-    )
+    doc_query = select(
+        user_daily_doc_uploads.c.date,
+        user_daily_doc_uploads.c.document_count,
+        user_daily_doc_uploads.c.refreshed_at
+    ).where(
+        user_daily_doc_uploads.c.user_id == current_user.id,
+        user_daily_doc_uploads.c.date >= start_date.date()
+    ).order_by(user_daily_doc_uploads.c.date)
     
     # Chat messages over time
-    chat_activity = await db.execute(
-        select(
-            func.date(ChatMessage.created_at).label('date'),
-            func.count(ChatMessage.id).label('count')
-        ).join(ChatSession, ChatMessage.session_id == ChatSession.id)
-        .where(
-            ChatSession.user_id == current_user.id,
-            ChatMessage.created_at >= start_date
-        ).group_by(func.date(ChatMessage.created_at))
-        .order_by(func.date(ChatMessage.created_at))
-    )
+    chat_query = select(
+        user_daily_messages.c.date,
+        user_daily_messages.c.message_count,
+        user_daily_messages.c.refreshed_at
+    ).where(
+        user_daily_messages.c.user_id == current_user.id,
+        user_daily_messages.c.date >= start_date.date()
+    ).order_by(user_daily_messages.c.date)
+    
+    # Users with no documents or chats (e.g. new accounts) can't have activity,
+    # and the counters on the user row say so without a query
+    queries = {}
+    if current_user.document_count:
+        queries["documents"] = doc_query
+    if current_user.chat_session_count:
+        queries["chats"] = chat_query
+    
+    results = dict(zip(queries, await fetch_all_concurrently(*queries.values())))
+    doc_activity = results.get("documents", [])
+    chat_activity = results.get("chats", [])
     
     return {
         "document_uploads": [
-            {"date": str(row.date), "count": row.count} 
+            {"date": row.date, "count": row.document_count} 
             for row in doc_activity
         ],
         "chat_messages": [
-            {"date": str(row.date), "count": row.count} 
+            {"date": row.date, "count": row.message_count} 
             for row in chat_activity
-        ]
+        ],
+        "stale_as_of": _stale_as_of(doc_activity, chat_activity)
     }
 
 @router.get("/user/documents/insights", response_model=Dict[str, Any])
 async def get_document_insights(
-    current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_active_user)
 ):
     """Get insights about user's documents"""
     
-    # File type distribution
-    file_types = await db.execute(
-        select(
-            Document.file_type,
-            func.count(Document.id).label('count'),
-            func.sum(Document.file_size).label('total_size')
-        ).where(Document.owner_id == current_user.id)
-        .group_by(Document.file_type)
-    )
+    if not current_user.document_count:
+        return {"file_types": [], "processing_status": [], "recent_documents": []}
     
-    # Processing status distribution
-    processing_status = await db.execute(
-        select(
-            Document.processing_status,
-            func.count(Document.id).label('count')
-        ).where(Document.owner_id == current_user.id)
-        .group_by(Document.processing_status)
+    # File type and processing status distributions in one scan via GROUPING SETS;
+    # grouping(file_type) is 1 on the per-status rows
+    distribution_query = select(
+        Document.file_type,
+        Document.processing_status,
+        func.grouping(Document.file_type).label('by_status'),
+        func.count(Document.id).label('document_count'),
+        func.sum(Document.file_size).label('total_size')
+    ).where(Document.owner_id == current_user.id).group_by(
+        func.grouping_sets(tuple_(Document.file_type), tuple_(Document.processing_status))
     )
     
     # Most recent documents
-    recent_docs = await db.execute(
-        select(Document.title, Document.created_at, Document.file_type)
-        .where(Document.owner_id == current_user.id)
-        .order_by(Document.created_at.desc())
-        .limit(5)
+    recent_docs_query = select(
+        Document.title, Document.created_at, Document.file_type
+    ).where(Document.owner_id == current_user.id).order_by(Document.created_at.desc()).limit(5)
+    
+    distribution, recent_docs = await fetch_all_concurrently(
+        distribution_query, recent_docs_query
     )
     
     return {
         "file_types": [
             {
                 "type": row.file_type,
-                "count": row.count,
+                "count": row.document_count,
                 "total_size": row.total_size or 0
-            } for row in file_types
+            } for row in distribution if not row.by_status
         ],
         "processing_status": [
-            {"status": row.processing_status, "count": row.count}
-            for row in processing_status
+            {"status": row.processing_status, "count": row.document_count}
+            for row in distribution if row.by_status
         ],
         "recent_documents": [
             {
                 "title": doc.title,
-                "created_at": doc.created_at.isoformat(),
+                "created_at": doc.created_at,
                 "file_type": doc.file_type
             } for doc in recent_docs
         ]
@@ -169,49 +161,46 @@ async def get_system_statistics(
             detail="Admin access required"
         )
     
-    # Count total users
-    users_result = await db.execute(select(func.count(User.id)))
-    total_users = users_result.scalar()
-    
-    # Count total documents
-    docs_result = await db.execute(select(func.count(Document.id)))
-    total_documents = docs_result.scalar()
-    
-    # Count total workflows
-    wf_result = await db.execute(select(func.count(Workflow.id)))
-    total_workflows = wf_result.scalar()
-    
-    # Count total chat sessions
-    chat_result = await db.execute(select(func.count(ChatSession.id)))
-    total_chat_sessions = chat_result.scalar()
+    cached_stats = stats_cache.get(SYSTEM_STATS_KEY)
+    if cached_stats is not None:
+        return cached_stats
     
-    # Active sessions (last 24 hours)
     yesterday = datetime.utcnow() - timedelta(days=1)
-    active_result = await db.execute(
-        select(func.count(ChatSession.id)).where(ChatSession.last_message_at >= yesterday)
-    )
-    active_sessions = active_result.scalar()
-    
-    # Messages today
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_messages = await db.execute(
-        select(func.count(ChatMessage.id)).where(ChatMessage.created_at >= today)
+    
+    # Fold every system-wide counter into a single SELECT
+    stats_query = select(
+        select(func.count(User.id)).scalar_subquery().label('total_users'),
+        select(func.count(Document.id)).scalar_subquery().label('total_documents'),
+        select(func.count(Workflow.id)).scalar_subquery().label('total_workflows'),
+        select(func.count(ChatSession.id)).scalar_subquery().label('total_chat_sessions'),
+        # Active sessions (last 24 hours)
+        select(func.count(ChatSession.id))
+        .where(ChatSession.last_message_at >= yesterday)
+        .scalar_subquery().label('active_sessions'),
+        # Messages today
+        select(func.count(ChatMessage.id))
+        .where(ChatMessage.created_at >= today)
+        .scalar_subquery().label('api_calls_today')
     )
-    api_calls_today = today_messages.scalar()
+    stats = (await db.execute(stats_query)).one()
     
-    return SystemStatsResponse(
-        total_users=total_users,
-        total_documents=total_documents,
-        total_workflows=total_workflows,
-        total_chat_sessions=total_chat_sessions,
-        api_calls_today=api_calls_today,
-        active_sessions=active_sessions
+    system_stats = SystemStatsResponse(
+        total_users=stats.total_users,
+        total_documents=stats.total_documents,
+        total_workflows=stats.total_workflows,
+        total_chat_sessions=stats.total_chat_sessions,
+        api_calls_today=stats.api_calls_today,
+        active_sessions=stats.active_sessions
     )
+    # Admin polling is infrequent, so system stats can live longer
+    stats_cache.set(SYSTEM_STATS_KEY, system_stats, ttl_seconds=settings.SYSTEM_STATS_CACHE_TTL_SECONDS)
+    
+    return system_stats
 
 @router.get("/system/health", response_model=Dict[str, Any])
 async def get_system_health(
-    current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_active_user)
 ):
     """Get system health status"""
     
@@ -221,19 +210,26 @@ async def get_system_health(
             detail="Admin access required"
         )
     
-    # Test database connection
-    try:
-        await db.execute(text("SELECT 1"))
-        db_status = "healthy"
-    except Exception:
-        db_status = "unhealthy"
-    
-    # Check Gemini API status
     from app.services.gemini_service import gemini_service
-    try:
-        gemini_status = "healthy" if await gemini_service.health_check() else "unhealthy"
-    except Exception:
-        gemini_status = "unhealthy"
+    
+    # Test database connection (reused for a few seconds)
+    async def check_database() -> str:
+        return "healthy" if await check_db_connection() else "unhealthy"
+    
+    # Check Gemini API status; the probe is a real generation call, so memoize it
+    async def check_gemini() -> str:
+        cached_status = health_cache.get(GEMINI_HEALTH_KEY)
+        if cached_status is not None:
+            return cached_status
+        try:
+            gemini_status = "healthy" if await gemini_service.health_check() else "unhealthy"
+        except Exception:
+            gemini_status = "unhealthy"
+        health_cache.set(GEMINI_HEALTH_KEY, gemini_status)
+        return gemini_status
+    
+    # Both probes hit different services, so run them side by side
+    db_status, gemini_status = await asyncio.gather(check_database(), check_gemini())
     
     return {
         "status": "healthy" if db_status == "healthy" and gemini_status == "healthy" else "degraded",
@@ -242,13 +238,12 @@ async def get_system_health(
             "gemini_api": gemini_status,
             "api": "healthy"
         },
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow()
     }
 
 @router.get("/reports/usage", response_model=Dict[str, Any])
 async def get_usage_report(
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db),
     days: int = 7
 ):
     """Get usage report for the past N days"""
@@ -261,52 +256,54 @@ async def get_usage_report(
     
     start_date = datetime.utcnow() - timedelta(days=days)
     
-    # Daily user registrations
-    registrations = await db.execute(
-        select(
-            func.date(User.created_at).label('date'),
-            func.count(User.id).label('count')
-        ).where(User.created_at >= start_date)
-        .group_by(func.date(User.created_at))
-        .order_by(func.date(User.created_at))
-    )
+    # Daily user registrations, bucketed by UTC day
+    registration_day = func.date_trunc('day', func.timezone('UTC', User.created_at))
+    registrations_query = select(
+        registration_day.label('date'),
+        func.count(User.id).label('user_count')
+    ).where(
+        User.created_at >= start_date
+    ).group_by(registration_day).order_by(registration_day)
     
     # Daily document uploads
-    uploads = await db.execute(
-        select(
-            func.date(Document.created_at).label('date'),
-            func.count(Document.id).label('count'),
-            func.sum(Document.file_size).label('total_size')
-        ).where(Document.created_at >= start_date)
-        .group_by(func.date(Document.created_at))
-        .order_by(func.date(Document.created_at))
-    )
+    uploads_query = select(
+        user_daily_doc_uploads.c.date,
+        func.sum(user_daily_doc_uploads.c.document_count).label('document_count'),
+        func.sum(user_daily_doc_uploads.c.total_size).label('total_size'),
+        func.max(user_daily_doc_uploads.c.refreshed_at).label('refreshed_at')
+    ).where(
+        user_daily_doc_uploads.c.date >= start_date.date()
+    ).group_by(user_daily_doc_uploads.c.date).order_by(user_daily_doc_uploads.c.date)
     
     # Daily chat activity
-    chat_activity = await db.execute(
-        select(
-            func.date(ChatMessage.created_at).label('date'),
-            func.count(ChatMessage.id).label('count')
-        ).where(ChatMessage.created_at >= start_date)
-        .group_by(func.date(ChatMessage.created_at))
-        .order_by(func.date(ChatMessage.created_at))
+    chat_activity_query = select(
+        user_daily_messages.c.date,
+        func.sum(user_daily_messages.c.message_count).label('message_count'),
+        func.max(user_daily_messages.c.refreshed_at).label('refreshed_at')
+    ).where(
+        user_daily_messages.c.date >= start_date.date()
+    ).group_by(user_daily_messages.c.date).order_by(user_daily_messages.c.date)
+    
+    registrations, uploads, chat_activity = await fetch_all_concurrently(
+        registrations_query, uploads_query, chat_activity_query
     )
     
     return {
         "period_days": days,
         "user_registrations": [
-            {"date": str(row.date), "count": row.count}
+            {"date": row.date.date(), "count": row.user_count}
             for row in registrations
         ],
         "document_uploads": [
             {
-                "date": str(row.date),
-                "count": row.count,
+                "date": row.date,
+                "count": row.document_count,
                 "total_size": row.total_size or 0
             } for row in uploads
         ],
         "chat_activity": [
-            {"date": str(row.date), "count": row.count}
+            {"date": row.date, "count": row.message_count}
             for row in chat_activity
-        ]
+        ],
+        "stale_as_of": _stale_as_of(uploads, chat_activity)
     }
\ No newline at end of file
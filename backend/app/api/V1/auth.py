@@ -13,10 +13,10 @@ import uuid
 
 from app.core.database import get_db
 from app.core.config import settings
-from app.models.orm_models import User
+from app.models.orm_models import User, uuid7
 from app.models.schemas import (
     UserCreate, UserLogin, UserResponse, Token, TokenData,
-    BaseResponse, ErrorResponse
+    BaseResponse, ErrorResponse, construct_from_row
 )
 
 router = APIRouter()
@@ -94,6 +94,23 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+# Cached id of the admin account that owns public uploads and workflow runs (it never changes)
+_default_user_id: Optional[uuid.UUID] = None
+
+async def get_default_user_id(db: AsyncSession) -> uuid.UUID:
+    """Id of the default admin user, looked up once per process"""
+    global _default_user_id
+    if _default_user_id is None:
+        result = await db.execute(select(User.id).where(User.username == "admin"))
+        _default_user_id = result.scalar_one_or_none()
+        
+        if not _default_user_id:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Default user not found. Please ensure database is initialized."
+            )
+    return _default_user_id
+
 @router.post("/register", response_model=BaseResponse)
 async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user"""
@@ -116,7 +133,7 @@ async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_db
     # Create new user
     hashed_password = get_password_hash(user_data.password)
     db_user = User(
-        id=uuid.uuid4(),
+        id=uuid7(),
         email=user_data.email,
         username=user_data.username,
         full_name=user_data.full_name,
@@ -128,7 +145,6 @@ async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_db
     
     db.add(db_user)
     await db.commit()
-    await db.refresh(db_user)
     
     return BaseResponse(message="User registered successfully")
 
@@ -163,7 +179,7 @@ async def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Async
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: User = Depends(get_current_active_user)):
     """Get current user information"""
-    return UserResponse.model_validate(current_user)
+    return construct_from_row(UserResponse, current_user)
 
 @router.post("/logout", response_model=BaseResponse)
 async def logout_user(current_user: User = Depends(get_current_active_user)):
@@ -1,25 +1,35 @@
 """
 Chat API endpoints for workflow interaction
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, insert, update, delete, any_, bindparam
 from typing import List, Optional, Dict, Any
 import uuid
+import orjson
+import asyncio
+import time
+import logging
 from datetime import datetime
 
-from app.core.database import get_db
-from app.models.orm_models import ChatSession, ChatMessage, User, Document
+from app.core.database import get_db, AsyncSessionLocal
+from app.models.orm_models import ChatSession, ChatMessage, User, Document, user_counter_update, uuid7
 from app.models.schemas import (
     ChatSessionCreate, ChatSessionUpdate, ChatSessionResponse,
     ChatMessageCreate, ChatMessageResponse, ChatResponse,
-    ChatSessionListResponse, BaseResponse
+    ChatSessionListResponse, BaseResponse, construct_from_row
 )
 from app.api.V1.auth import get_current_active_user
 from app.services.gemini_service import gemini_service
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+# Keep references to fire-and-forget writes so they aren't garbage collected
+_background_tasks = set()
+
 @router.post("/sessions", response_model=ChatSessionResponse)
 async def create_chat_session(
     session_data: ChatSessionCreate,
@@ -29,7 +39,7 @@ async def create_chat_session(
     """Create a new chat session"""
     
     session = ChatSession(
-        id=uuid.uuid4(),
+        id=uuid7(),
         title=session_data.title,
         context_documents=session_data.context_documents,
         system_prompt=session_data.system_prompt,
@@ -37,29 +47,33 @@ async def create_chat_session(
     )
     
     db.add(session)
+    await db.execute(user_counter_update(current_user.id, chat_session_count=1))
+    # created_at comes back in the INSERT's RETURNING clause, no refresh needed
     await db.commit()
-    await db.refresh(session)
     
-    return ChatSessionResponse.model_validate(session)
+    return construct_from_row(ChatSessionResponse, session)
 
 @router.get("/sessions", response_model=ChatSessionListResponse)
 async def get_chat_sessions(
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100)
 ):
-    """Get all chat sessions for current user"""
+    """Get chat sessions for current user"""
     
     result = await db.execute(
         select(ChatSession)
         .where(ChatSession.user_id == current_user.id)
         .order_by(ChatSession.updated_at.desc())
+        .offset(skip).limit(limit)
     )
     sessions = result.scalars().all()
     
     return ChatSessionListResponse(
         message="Chat sessions retrieved successfully",
-        sessions=[ChatSessionResponse.model_validate(session) for session in sessions],
-        total=len(sessions)
+        sessions=[construct_from_row(ChatSessionResponse, session) for session in sessions],
+        total=current_user.chat_session_count
     )
 
 @router.get("/sessions/{session_id}", response_model=ChatSessionResponse)
@@ -84,24 +98,81 @@ async def get_chat_session(
             detail="Chat session not found"
         )
     
-    return ChatSessionResponse.model_validate(session)
+    return construct_from_row(ChatSessionResponse, session)
 
 @router.get("/sessions/{session_id}/messages", response_model=List[ChatMessageResponse])
 async def get_chat_messages(
     session_id: uuid.UUID,
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    before: Optional[datetime] = Query(None),
+    limit: int = Query(50, ge=1, le=200)
 ):
-    """Get all messages in a chat session"""
+    """Get the most recent messages in a chat session, oldest first; pass before to page back"""
     
-    # Verify session belongs to user
-    session_result = await db.execute(
-        select(ChatSession).where(
-            ChatSession.id == session_id,
-            ChatSession.user_id == current_user.id
+    # Keyset page: newest `limit` messages older than `before`, scoped to the user's session
+    query = select(ChatMessage).join(ChatSession).where(
+        ChatSession.id == session_id,
+        ChatSession.user_id == current_user.id
+    )
+    if before:
+        query = query.where(ChatMessage.created_at < before)
+    
+    result = await db.execute(
+        query.order_by(ChatMessage.created_at.desc()).limit(limit)
+    )
+    messages = result.scalars().all()
+    
+    # An empty page is either the end of history or someone else's session
+    if not messages:
+        session_result = await db.execute(
+            select(ChatSession.id).where(
+                ChatSession.id == session_id,
+                ChatSession.user_id == current_user.id
+            )
         )
+        if session_result.scalar_one_or_none() is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Chat session not found"
+            )
+    
+    return [construct_from_row(ChatMessageResponse, msg) for msg in reversed(messages)]
+
+# The user's own non-empty context documents, aggregated into one array
+_context_content = (
+    select(func.array_agg(Document.content))
+    .where(
+        Document.id == any_(ChatSession.context_documents),
+        Document.owner_id == ChatSession.user_id,
+        Document.content.isnot(None),
+        Document.content != ""
     )
-    session = session_result.scalar_one_or_none()
+    .correlate(ChatSession)
+    .scalar_subquery()
+)
+
+# Built once at import; runs on every chat message with bound parameters
+_session_context_query = select(
+    ChatSession.id, _context_content.label("context_content")
+).where(
+    ChatSession.id == bindparam("session_id"),
+    ChatSession.user_id == bindparam("user_id")
+)
+
+async def get_session_context(
+    db: AsyncSession,
+    session_id: uuid.UUID,
+    current_user: User
+) -> List[str]:
+    """Return the text of a user's chat session context documents, or raise 404"""
+    
+    # Verify session belongs to user and fetch its context in the same round-trip
+    session_result = await db.execute(
+        _session_context_query,
+        {"session_id": session_id, "user_id": current_user.id}
+    )
+    session = session_result.one_or_none()
     
     if not session:
         raise HTTPException(
@@ -109,64 +180,83 @@ async def get_chat_messages(
             detail="Chat session not found"
         )
     
-    # Get messages
-    result = await db.execute(
-        select(ChatMessage)
-        .where(ChatMessage.session_id == session_id)
-        .order_by(ChatMessage.created_at.asc())
-    )
-    messages = result.scalars().all()
+    return session.context_content or []
+
+async def save_chat_turn(
+    db: AsyncSession,
+    session_id: uuid.UUID,
+    user_content: str,
+    ai_content: str,
+    start_time: datetime,
+    end_time: datetime,
+    response_time_ms: int,
+    context_count: int,
+    ai_message_id: Optional[uuid.UUID] = None
+) -> ChatMessage:
+    """Store a user message and its AI reply"""
+    
+    # Save the user message and AI response in one multi-row INSERT
+    message_rows = [
+        {
+            "id": uuid7(),
+            "session_id": session_id,
+            "role": "user",
+            "content": user_content,
+            "created_at": start_time,
+            "response_time_ms": None,
+            "model_used": None,
+            "context_used": None
+        },
+        {
+            "id": ai_message_id or uuid7(),
+            "session_id": session_id,
+            "role": "assistant",
+            "content": ai_content,
+            "created_at": end_time,
+            "response_time_ms": response_time_ms,
+            "model_used": "gemini-1.5-flash",
+            "context_used": {"documents_count": context_count} if context_count else None
+        }
+    ]
+    inserted = await db.scalars(insert(ChatMessage).returning(ChatMessage, sort_by_parameter_order=True), message_rows)
+    user_message, ai_message = inserted.all()
     
-    return [ChatMessageResponse.model_validate(msg) for msg in messages]
+    return ai_message
+
+async def bump_session_stats(db: AsyncSession, session_id: uuid.UUID, last_message_at: datetime):
+    """Count a new user/AI message pair on the session, atomically"""
+    await db.execute(
+        update(ChatSession)
+        .where(ChatSession.id == session_id)
+        .values(message_count=ChatSession.message_count + 2, last_message_at=last_message_at)
+    )
+
+async def update_session_stats(session_id: uuid.UUID, last_message_at: datetime):
+    """Session bookkeeping run after the response is sent, on its own database session"""
+    try:
+        async with AsyncSessionLocal() as db:
+            await bump_session_stats(db, session_id, last_message_at)
+            await db.commit()
+    except Exception as e:
+        logger.warning(f"Failed to update chat session stats: {e}")
 
 @router.post("/sessions/{session_id}/messages", response_model=ChatResponse)
 async def send_chat_message(
     session_id: uuid.UUID,
     message_data: ChatMessageCreate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Send a message and get AI response"""
     
-    # Verify session belongs to user
-    session_result = await db.execute(
-        select(ChatSession).where(
-            ChatSession.id == session_id,
-            ChatSession.user_id == current_user.id
-        )
-    )
-    session = session_result.scalar_one_or_none()
-    
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Chat session not found"
-        )
+    context_content = await get_session_context(db, session_id, current_user)
     
     start_time = datetime.utcnow()
+    # Durations come from the monotonic clock; the datetimes are only message timestamps
+    started_ns = time.perf_counter_ns()
     
     try:
-        # Save user message
-        user_message = ChatMessage(
-            id=uuid.uuid4(),
-            session_id=session_id,
-            role="user",
-            content=message_data.content
-        )
-        db.add(user_message)
-        
-        # Get context documents if specified
-        context_content = []
-        if session.context_documents:
-            doc_result = await db.execute(
-                select(Document).where(
-                    Document.id.in_(session.context_documents),
-                    Document.owner_id == current_user.id
-                )
-            )
-            documents = doc_result.scalars().all()
-            context_content = [doc.content for doc in documents if doc.content]
-        
         # Generate AI response
         if context_content:
             ai_response = await gemini_service.chat_with_context(
@@ -176,32 +266,18 @@ async def send_chat_message(
         else:
             ai_response = await gemini_service.generate_text(message_data.content)
         
+        response_time_ms = (time.perf_counter_ns() - started_ns) // 1_000_000
         end_time = datetime.utcnow()
-        response_time_ms = int((end_time - start_time).total_seconds() * 1000)
-        
-        # Save AI response
-        ai_message = ChatMessage(
-            id=uuid.uuid4(),
-            session_id=session_id,
-            role="assistant",
-            content=ai_response,
-            response_time_ms=response_time_ms,
-            model_used="gemini-1.5-flash",
-            context_used={"documents_count": len(context_content)} if context_content else None
+        ai_message = await save_chat_turn(
+            db, session_id, message_data.content, ai_response,
+            start_time, end_time, response_time_ms, len(context_content)
         )
-        db.add(ai_message)
-        
-        # Update session
-        session.message_count += 2
-        session.last_message_at = datetime.utcnow()
-        
         await db.commit()
-        await db.refresh(ai_message)
         
-        return ChatResponse(
-            message="Message sent successfully",
-            data=ChatMessageResponse.model_validate(ai_message)
-        )
+        # message_count / last_message_at may lag the response slightly
+        background_tasks.add_task(update_session_stats, session_id, end_time)
+        
+        return ChatResponse(message=construct_from_row(ChatMessageResponse, ai_message))
         
     except Exception as e:
         await db.rollback()
@@ -210,6 +286,68 @@ async def send_chat_message(
             detail=f"Failed to process message: {str(e)}"
         )
 
+async def persist_streamed_turn(**turn):
+    """Save a streamed chat turn on its own database session"""
+    try:
+        async with AsyncSessionLocal() as db:
+            await save_chat_turn(db, **turn)
+            await bump_session_stats(db, turn["session_id"], turn["end_time"])
+            await db.commit()
+    except Exception:
+        logger.exception(f"Failed to save streamed chat turn for session {turn['session_id']}")
+
+def schedule_streamed_turn_save(**turn):
+    """Write a streamed turn in the background so the final event isn't held up by the commit"""
+    task = asyncio.create_task(persist_streamed_turn(**turn))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+@router.post("/sessions/{session_id}/messages/stream")
+async def stream_chat_message(
+    session_id: uuid.UUID,
+    message_data: ChatMessageCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Send a message and stream the AI response as server-sent events"""
+    
+    context_content = await get_session_context(db, session_id, current_user)
+    if context_content:
+        prompt = gemini_service.build_context_prompt(message_data.content, context_content)
+    else:
+        prompt = message_data.content
+    
+    start_time = datetime.utcnow()
+    started_ns = time.perf_counter_ns()
+    
+    async def event_stream():
+        chunks = []
+        ai_message_id = uuid7()
+        try:
+            async for chunk in gemini_service.stream_text(prompt):
+                chunks.append(chunk)
+                yield f"data: {orjson.dumps({'type': 'token', 'content': chunk}).decode()}\n\n"
+        finally:
+            # Also runs when the client disconnects mid-stream, so the turn is
+            # saved with whatever part of the reply had arrived
+            if chunks:
+                schedule_streamed_turn_save(
+                    session_id=session_id,
+                    user_content=message_data.content,
+                    ai_content="".join(chunks).strip(),
+                    start_time=start_time,
+                    end_time=datetime.utcnow(),
+                    response_time_ms=(time.perf_counter_ns() - started_ns) // 1_000_000,
+                    context_count=len(context_content),
+                    ai_message_id=ai_message_id
+                )
+        
+        # An empty reply isn't saved, so there is no message to point to
+        message_id = str(ai_message_id) if chunks else None
+        yield f"data: {orjson.dumps({'type': 'done', 'message_id': message_id}).decode()}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @router.put("/sessions/{session_id}", response_model=ChatSessionResponse)
 async def update_chat_session(
     session_id: uuid.UUID,
@@ -219,12 +357,19 @@ async def update_chat_session(
 ):
     """Update a chat session"""
     
-    result = await db.execute(
-        select(ChatSession).where(
-            ChatSession.id == session_id,
-            ChatSession.user_id == current_user.id
-        )
+    owned_session = (
+        ChatSession.id == session_id,
+        ChatSession.user_id == current_user.id
     )
+    
+    # Update session fields, checking ownership in the same statement
+    update_data = session_update.model_dump(exclude_unset=True)
+    if update_data:
+        result = await db.execute(
+            update(ChatSession).where(*owned_session).values(**update_data).returning(ChatSession)
+        )
+    else:
+        result = await db.execute(select(ChatSession).where(*owned_session))
     session = result.scalar_one_or_none()
     
     if not session:
@@ -233,15 +378,9 @@ async def update_chat_session(
             detail="Chat session not found"
         )
     
-    # Update session fields
-    update_data = session_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(session, field, value)
-    
     await db.commit()
-    await db.refresh(session)
     
-    return ChatSessionResponse.model_validate(session)
+    return construct_from_row(ChatSessionResponse, session)
 
 @router.delete("/sessions/{session_id}", response_model=BaseResponse)
 async def delete_chat_session(
@@ -251,21 +390,28 @@ async def delete_chat_session(
 ):
     """Delete a chat session"""
     
-    result = await db.execute(
-        select(ChatSession).where(
-            ChatSession.id == session_id,
-            ChatSession.user_id == current_user.id
+    owned_session = (
+        ChatSession.id == session_id,
+        ChatSession.user_id == current_user.id
+    )
+    
+    # Messages first (the foreign key has no ON DELETE CASCADE), then the session
+    await db.execute(
+        delete(ChatMessage).where(
+            ChatMessage.session_id.in_(select(ChatSession.id).where(*owned_session))
         )
     )
-    session = result.scalar_one_or_none()
+    result = await db.execute(
+        delete(ChatSession).where(*owned_session).returning(ChatSession.id)
+    )
     
-    if not session:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Chat session not found"
         )
     
-    await db.delete(session)
+    await db.execute(user_counter_update(current_user.id, chat_session_count=-1))
     await db.commit()
     
     return BaseResponse(message="Chat session deleted successfully")
\ No newline at end of file
@@ -3,27 +3,34 @@ Document processing API endpoints with Gemini AI integration
 """
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Form
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import List, Optional
+from sqlalchemy.orm import defer
+from sqlalchemy import select, func, insert, update, delete
+from typing import BinaryIO, List, Optional
 import uuid
 import os
-import aiofiles
+import asyncio
+import time
 from pathlib import Path
 import mimetypes
-from datetime import datetime
+import logging
+from datetime import datetime, timezone
 
 from app.core.database import get_db
 from app.core.config import settings
-from app.models.orm_models import Document, DocumentChunk, User
+from app.core.workers import get_process_pool
+from app.core.cache import analysis_cache, text_key, invalidate_user_documents
+from app.models.orm_models import Document, DocumentChunk, WorkflowDocument, User, user_counter_update, uuid7, EMBEDDING_DIMENSION
 from app.models.schemas import (
     DocumentResponse, DocumentCreate, DocumentUpdate, DocumentListResponse,
     DocumentUploadResponse, DocumentAnalysisRequest, DocumentAnalysisResponse,
-    BaseResponse, ErrorResponse
+    BaseResponse, ErrorResponse, document_list_adapter, construct_from_row
 )
-from app.api.V1.auth import get_current_active_user
+from app.api.V1.auth import get_current_active_user, get_default_user_id
 from app.services.gemini_service import gemini_service
 from app.services.embeddings_service import embedding_service
-from app.utils.pdf_utils import extract_text_from_pdf_bytes
+from app.utils.pdf_utils import extract_text_from_pdf_file
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -36,100 +43,162 @@ ALLOWED_EXTENSIONS = {
     '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
 }
 
-def get_file_type(filename: str) -> tuple[str, str]:
-    """Get file extension and MIME type"""
-    ext = Path(filename).suffix.lower()
-    mime_type = ALLOWED_EXTENSIONS.get(ext, 'application/octet-stream')
-    return ext[1:] if ext else 'unknown', mime_type
+def get_file_type(filename: str) -> tuple[str, Optional[str]]:
+    """Get file extension and MIME type (None when the type isn't allowed)"""
+    _, dot, ext = filename.rpartition('.')
+    ext = ext.lower() if dot else ''
+    return ext or 'unknown', ALLOWED_EXTENSIONS.get(f'.{ext}')
+
+# Chunks embedded and inserted together (matches the embedding API batch limit)
+CHUNK_BATCH_SIZE = 100
+
+# Bytes read from an upload per write, so memory stays flat regardless of file size
+UPLOAD_CHUNK_SIZE = 1 << 20
 
-async def save_uploaded_file(file: UploadFile, user_id: uuid.UUID) -> str:
-    """Save uploaded file to disk"""
+def _copy_upload(source: BinaryIO, file_path: Path) -> int:
+    """Copy an upload to disk in chunks, stopping once it exceeds MAX_FILE_SIZE"""
+    file_size = 0
+    with open(file_path, 'wb') as f:
+        while chunk := source.read(UPLOAD_CHUNK_SIZE):
+            file_size += len(chunk)
+            if file_size > settings.MAX_FILE_SIZE:
+                break
+            f.write(chunk)
+    return file_size
+
+async def save_uploaded_file(file: UploadFile, user_id: uuid.UUID, file_type: str) -> tuple[str, int]:
+    """Stream uploaded file to disk, returning its path and size in bytes"""
     # Create user-specific upload directory
     user_upload_dir = Path(settings.UPLOAD_DIR) / str(user_id)
     user_upload_dir.mkdir(parents=True, exist_ok=True)
     
     # Generate unique filename
     file_id = str(uuid.uuid4())
-    file_ext = Path(file.filename).suffix
-    safe_filename = f"{file_id}{file_ext}"
+    safe_filename = f"{file_id}.{file_type}"
     file_path = user_upload_dir / safe_filename
     
-    # Save file
-    async with aiofiles.open(file_path, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
+    # Save file in a single worker thread hop; UploadFile.size isn't known for
+    # chunked requests, so the copy counts bytes as it goes
+    file_size = await asyncio.to_thread(_copy_upload, file.file, file_path)
+    
+    if file_size > settings.MAX_FILE_SIZE:
+        file_path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File size exceeds maximum allowed size of {settings.MAX_FILE_SIZE} bytes"
+        )
     
-    return str(file_path)
+    return str(file_path), file_size
+
+def _read_text_file(file_path: str) -> str:
+    """Read a saved text file (blocking)"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
 
 async def extract_text_content(file_path: str, file_type: str) -> str:
     """Extract text content from file"""
     try:
         if file_type == 'pdf':
-            # Read file as bytes for PDF processing
-            async with aiofiles.open(file_path, 'rb') as f:
-                file_bytes = await f.read()
-            return extract_text_from_pdf_bytes(file_bytes)
+            # Parsing is CPU-bound, so it runs in a worker process; the worker
+            # opens the file itself rather than receiving its bytes
+            return await asyncio.get_running_loop().run_in_executor(
+                get_process_pool(), extract_text_from_pdf_file, file_path
+            )
         elif file_type in ['txt', 'md']:
-            async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                return await f.read()
+            return await asyncio.to_thread(_read_text_file, file_path)
         else:
             return "Text extraction not supported for this file type"
     except Exception as e:
         return f"Error extracting text: {str(e)}"
 
+def chunk_bounds(length: int, chunk_size: int, overlap: int) -> List[tuple[int, int]]:
+    """(start, end) offsets of overlapping chunks covering length characters"""
+    bounds = []
+    start = 0
+    while start < length:
+        end = min(start + chunk_size, length)
+        bounds.append((start, end))
+        if end == length:
+            break
+        # Step back by the overlap so neighbouring chunks share context
+        start += chunk_size - overlap
+    return bounds
+
+async def embed_chunk_texts(document_id: uuid.UUID, chunk_texts: List[str]) -> List[Optional[List[float]]]:
+    """Embed a batch of chunk texts, or return no embeddings if that fails"""
+    try:
+        return await embedding_service.create_embeddings(chunk_texts)
+    except Exception as e:
+        logger.warning(f"Failed to create embeddings for document {document_id}: {e}")
+        return [None] * len(chunk_texts)
+
 async def create_document_chunks(document_id: uuid.UUID, content: str, db: AsyncSession):
     """Create document chunks for embeddings"""
     chunk_size = 1000  # characters per chunk
     overlap = 200      # character overlap between chunks
     
-    chunks = []
-    start = 0
-    chunk_index = 0
+    # Offsets are cheap; chunk texts and embeddings only exist one batch at a time
+    spans = chunk_bounds(len(content), chunk_size, overlap)
+    batches = [spans[i:i + CHUNK_BATCH_SIZE] for i in range(0, len(spans), CHUNK_BATCH_SIZE)]
     
-    while start < len(content):
-        end = min(start + chunk_size, len(content))
-        chunk_content = content[start:end]
-        
-        # Create embedding for chunk
-        try:
-            embedding = await embedding_service.create_embedding(chunk_content)
-        except Exception as e:
-            print(f"Warning: Failed to create embedding for chunk {chunk_index}: {e}")
-            embedding = None
-        
-        chunk = DocumentChunk(
-            id=uuid.uuid4(),
-            document_id=document_id,
-            content=chunk_content,
-            chunk_index=chunk_index,
-            start_char=start,
-            end_char=end,
-            embedding=embedding,
-            embedding_model="gemini" if embedding else None
+    next_embeddings = None
+    if batches:
+        next_embeddings = asyncio.create_task(
+            embed_chunk_texts(document_id, [content[start:end] for start, end in batches[0]])
         )
-        
-        chunks.append(chunk)
-        db.add(chunk)
-        
-        start = max(start + chunk_size - overlap, end)
-        chunk_index += 1
     
-    return chunks
+    try:
+        for batch_number, batch in enumerate(batches):
+            embeddings = await next_embeddings
+            
+            # Embed the next batch while this one is written
+            if batch_number + 1 < len(batches):
+                next_embeddings = asyncio.create_task(
+                    embed_chunk_texts(document_id, [content[start:end] for start, end in batches[batch_number + 1]])
+                )
+            
+            rows = []
+            first_index = batch_number * CHUNK_BATCH_SIZE
+            for chunk_index, ((start, end), embedding) in enumerate(zip(batch, embeddings), start=first_index):
+                # The vector column has a fixed dimension
+                if embedding and len(embedding) != EMBEDDING_DIMENSION:
+                    logger.warning(f"Skipping {len(embedding)}-dimensional embedding for chunk {chunk_index}")
+                    embedding = None
+            
+                rows.append({
+                    "id": uuid7(),
+                    "document_id": document_id,
+                    "content": content[start:end],
+                    "chunk_index": chunk_index,
+                    "start_char": start,
+                    "end_char": end,
+                    "embedding": embedding,
+                    "embedding_model": "gemini" if embedding else None
+                })
+            
+            # One executemany INSERT per batch rather than a unit-of-work flush per chunk
+            await db.execute(insert(DocumentChunk), rows)
+    finally:
+        # A failed insert or a cancelled request must not leave the next
+        # batch embedding in the background for an upload that is gone
+        if next_embeddings is not None and not next_embeddings.done():
+            next_embeddings.cancel()
+    
+    return len(spans)
 
-@router.post("/upload", response_model=DocumentUploadResponse)
-async def upload_document(
-    file: UploadFile = File(...),
-    title: Optional[str] = Form(None),
-    extract_text: bool = Form(True),
-    analyze_content: bool = Form(True),
-    create_embeddings: bool = Form(True),
-    current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
-):
-    """Upload and process a document"""
-    
-    # Validate file size
-    if file.size > settings.MAX_FILE_SIZE:
+async def process_upload(
+    file: UploadFile,
+    title: Optional[str],
+    extract_text: bool,
+    analyze_content: bool,
+    create_embeddings: bool,
+    owner_id: uuid.UUID,
+    db: AsyncSession
+) -> DocumentUploadResponse:
+    """Validate, save and process an uploaded document for owner_id"""
+    
+    # Validate file size (when the client declared it)
+    if file.size is not None and file.size > settings.MAX_FILE_SIZE:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail=f"File size exceeds maximum allowed size of {settings.MAX_FILE_SIZE} bytes"
@@ -137,32 +206,35 @@ async def upload_document(
     
     # Validate file type
     file_type, mime_type = get_file_type(file.filename)
-    if Path(file.filename).suffix.lower() not in ALLOWED_EXTENSIONS:
+    if mime_type is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File type not supported. Allowed types: {list(ALLOWED_EXTENSIONS.keys())}"
         )
     
+    # Save file (rejects uploads that turn out to exceed the size limit)
+    file_path, file_size = await save_uploaded_file(file, owner_id, file_type)
+    
     try:
-        # Save file
-        file_path = await save_uploaded_file(file, current_user.id)
-        
         # Create document record
         document = Document(
-            id=uuid.uuid4(),
+            id=uuid7(),
             title=title or file.filename,
             filename=file.filename,
             file_path=file_path,
-            file_size=file.size,
+            file_size=file_size,
             file_type=file_type,
             mime_type=mime_type,
-            owner_id=current_user.id,
+            owner_id=owner_id,
             processing_status="processing"
         )
         
         db.add(document)
+        await db.execute(
+            user_counter_update(owner_id, document_count=1, total_storage_bytes=document.file_size)
+        )
         await db.commit()
-        await db.refresh(document)
+        invalidate_user_documents(owner_id)
         
         # Extract text if requested
         if extract_text:
@@ -178,29 +250,38 @@ async def upload_document(
                 
             except Exception as e:
                 document.extraction_status = "failed"
-                print(f"Text extraction failed: {e}")
+                logger.warning(f"Text extraction failed for document {document.id}: {e}")
         
         # Analyze content if requested
         if analyze_content and document.content:
             try:
-                analysis = await gemini_service.analyze_document(document.content)
+                # Re-uploads of the same content reuse the earlier analysis
+                content_key = text_key(document.content)
+                analysis = analysis_cache.get(content_key)
+                if analysis is None:
+                    analysis = await gemini_service.analyze_document(document.content)
+                    analysis_cache.set(content_key, analysis)
                 document.summary = analysis.get("summary")
                 document.topics = analysis.get("topics")
                 document.entities = analysis.get("entities")
                 document.insights = analysis.get("insights")
-                document.metadata = {"document_type": analysis.get("document_type")}
+                document.doc_metadata = {"document_type": analysis.get("document_type")}
             except Exception as e:
-                print(f"Document analysis failed: {e}")
+                logger.warning(f"Document analysis failed for document {document.id}: {e}")
         
         document.processing_status = "completed"
-        document.processed_at = datetime.utcnow()
+        # Timezone-aware like the values loaded from these timestamptz columns.
+        # updated_at is set here rather than by onupdate, which would leave it
+        # expired after the UPDATE
+        document.processed_at = document.updated_at = datetime.now(timezone.utc)
         
         await db.commit()
-        await db.refresh(document)
+        # The document's chunks only become searchable now
+        invalidate_user_documents(owner_id)
         
         return DocumentUploadResponse(
             message="Document uploaded and processed successfully",
-            document=DocumentResponse.model_validate(document)
+            document=construct_from_row(DocumentResponse, document)
         )
         
     except Exception as e:
@@ -210,6 +291,21 @@ async def upload_document(
             detail=f"Failed to process document: {str(e)}"
         )
 
+@router.post("/upload", response_model=DocumentUploadResponse)
+async def upload_document(
+    file: UploadFile = File(...),
+    title: Optional[str] = Form(None),
+    extract_text: bool = Form(True),
+    analyze_content: bool = Form(True),
+    create_embeddings: bool = Form(True),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Upload and process a document"""
+    return await process_upload(
+        file, title, extract_text, analyze_content, create_embeddings, current_user.id, db
+    )
+
 @router.post("/upload-public", response_model=DocumentUploadResponse)
 async def upload_document_public(
     file: UploadFile = File(...),
@@ -221,97 +317,11 @@ async def upload_document_public(
 ):
     """Upload and process a document (public endpoint for testing)"""
     
-    # Get or create default user for public uploads
-    result = await db.execute(select(User).where(User.username == "admin"))
-    default_user = result.scalar_one_or_none()
-    
-    if not default_user:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Default user not found. Please ensure database is initialized."
-        )
-    
-    # Validate file size
-    if file.size > settings.MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File size exceeds maximum allowed size of {settings.MAX_FILE_SIZE} bytes"
-        )
-    
-    # Validate file type
-    file_type, mime_type = get_file_type(file.filename)
-    if Path(file.filename).suffix.lower() not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File type not supported. Allowed types: {list(ALLOWED_EXTENSIONS.keys())}"
-        )
-    
-    try:
-        # Save file
-        file_path = await save_uploaded_file(file, default_user.id)
-        
-        # Create document record
-        document = Document(
-            id=uuid.uuid4(),
-            title=title or file.filename,
-            filename=file.filename,
-            file_path=file_path,
-            file_size=file.size,
-            file_type=file_type,
-            mime_type=mime_type,
-            owner_id=default_user.id,
-            processing_status="processing"
-        )
-        
-        db.add(document)
-        await db.commit()
-        await db.refresh(document)
-        
-        # Extract text if requested
-        if extract_text:
-            try:
-                content = await extract_text_content(file_path, file_type)
-                document.content = content
-                document.extraction_status = "completed"
-                
-                # Create chunks and embeddings if requested
-                if create_embeddings and content:
-                    await create_document_chunks(document.id, content, db)
-                    document.embedding_status = "completed"
-                
-            except Exception as e:
-                document.extraction_status = "failed"
-                print(f"Text extraction failed: {e}")
-        
-        # Analyze content if requested
-        if analyze_content and document.content:
-            try:
-                analysis = await gemini_service.analyze_document(document.content)
-                document.summary = analysis.get("summary")
-                document.topics = analysis.get("topics")
-                document.entities = analysis.get("entities")
-                document.insights = analysis.get("insights")
-                document.metadata = {"document_type": analysis.get("document_type")}
-            except Exception as e:
-                print(f"Document analysis failed: {e}")
-        
-        document.processing_status = "completed"
-        document.processed_at = datetime.utcnow()
-        
-        await db.commit()
-        await db.refresh(document)
-        
-        return DocumentUploadResponse(
-            message="Document uploaded and processed successfully",
-            document=DocumentResponse.model_validate(document)
-        )
-        
-    except Exception as e:
-        await db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to process document: {str(e)}"
-        )
+    # Public uploads belong to the default admin user
+    owner_id = await get_default_user_id(db)
+    return await process_upload(
+        file, title, extract_text, analyze_content, create_embeddings, owner_id, db
+    )
 
 @router.get("/public", response_model=DocumentListResponse)
 async def get_documents_public(
@@ -334,25 +344,22 @@ async def get_documents_public(
             per_page=limit
         )
     
-    query = select(Document).where(Document.owner_id == admin_user.id)
-    
-    # Get total count
-    count_result = await db.execute(
-        select(func.count(Document.id)).where(Document.owner_id == admin_user.id)
-    )
-    total = count_result.scalar()
+    query = select(Document).options(defer(Document.content)).where(Document.owner_id == admin_user.id)
     
-    # Get documents
-    query = query.order_by(Document.created_at.desc()).offset(skip).limit(limit)
+    # Get documents, plus one row to tell whether another page exists
+    query = query.order_by(Document.created_at.desc()).offset(skip).limit(limit + 1)
     result = await db.execute(query)
     documents = result.scalars().all()
+    has_more = len(documents) > limit
     
     return DocumentListResponse(
         message="Documents retrieved successfully",
-        documents=[DocumentResponse.model_validate(doc) for doc in documents],
-        total=total,
+        documents=document_list_adapter.validate_python(documents[:limit], from_attributes=True),
+        # Maintained on the user row, so no COUNT(*) is needed
+        total=admin_user.document_count,
         page=skip // limit + 1,
-        per_page=limit
+        per_page=limit,
+        has_more=has_more
     )
 
 @router.get("/", response_model=DocumentListResponse)
@@ -365,31 +372,43 @@ async def get_documents(
 ):
     """Get user's documents with optional search"""
     
-    query = select(Document).where(Document.owner_id == current_user.id)
+    # DocumentResponse has no content field, so leave the extracted text in the database
+    query = select(Document).options(defer(Document.content)).where(Document.owner_id == current_user.id)
     
     if search:
+        # Whole words anywhere in the title or text (full-text index), or any
+        # substring of the title, so partial words still match (trigram index)
         query = query.where(
-            Document.title.ilike(f"%{search}%") |
-            Document.content.ilike(f"%{search}%")
+            Document.content_tsv.match(search, postgresql_regconfig="english")
+            | Document.title.ilike(f"%{search}%")
         )
     
-    # Get total count
-    count_result = await db.execute(
-        select(func.count(Document.id)).where(Document.owner_id == current_user.id)
-    )
-    total = count_result.scalar()
-    
-    # Get documents
-    query = query.order_by(Document.created_at.desc()).offset(skip).limit(limit)
-    result = await db.execute(query)
+    # Get documents, plus one row to tell whether another page exists
+    page_query = query.order_by(Document.created_at.desc()).offset(skip).limit(limit + 1)
+    result = await db.execute(page_query)
     documents = result.scalars().all()
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    
+    if not search:
+        # Maintained on the user row, so no COUNT(*) is needed
+        total = current_user.document_count
+    elif not has_more and (documents or skip == 0):
+        # The last page of results tells the total by itself
+        total = skip + len(documents)
+    else:
+        count_result = await db.execute(
+            select(func.count()).select_from(query.order_by(None).subquery())
+        )
+        total = count_result.scalar()
     
     return DocumentListResponse(
         message="Documents retrieved successfully",
-        documents=[DocumentResponse.model_validate(doc) for doc in documents],
+        documents=document_list_adapter.validate_python(documents, from_attributes=True),
         total=total,
         page=skip // limit + 1,
-        per_page=limit
+        per_page=limit,
+        has_more=has_more
     )
 
 @router.get("/{document_id}", response_model=DocumentResponse)
@@ -401,7 +420,7 @@ async def get_document(
     """Get a specific document"""
     
     result = await db.execute(
-        select(Document).where(
+        select(Document).options(defer(Document.content)).where(
             Document.id == document_id,
             Document.owner_id == current_user.id
         )
@@ -414,7 +433,7 @@ async def get_document(
             detail="Document not found"
         )
     
-    return DocumentResponse.model_validate(document)
+    return construct_from_row(DocumentResponse, document)
 
 @router.put("/{document_id}", response_model=DocumentResponse)
 async def update_document(
@@ -425,12 +444,21 @@ async def update_document(
 ):
     """Update a document"""
     
-    result = await db.execute(
-        select(Document).where(
-            Document.id == document_id,
-            Document.owner_id == current_user.id
-        )
+    owned_document = (
+        Document.id == document_id,
+        Document.owner_id == current_user.id
     )
+    
+    # Update document fields, checking ownership in the same statement
+    update_data = document_update.model_dump(exclude_unset=True)
+    if update_data:
+        result = await db.execute(
+            update(Document).where(*owned_document).values(**update_data).returning(Document)
+        )
+    else:
+        result = await db.execute(
+            select(Document).options(defer(Document.content)).where(*owned_document)
+        )
     document = result.scalar_one_or_none()
     
     if not document:
@@ -439,15 +467,11 @@ async def update_document(
             detail="Document not found"
         )
     
-    # Update document fields
-    update_data = document_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(document, field, value)
-    
     await db.commit()
-    await db.refresh(document)
+    if update_data:
+        invalidate_user_documents(current_user.id)
     
-    return DocumentResponse.model_validate(document)
+    return construct_from_row(DocumentResponse, document)
 
 @router.delete("/{document_id}", response_model=BaseResponse)
 async def delete_document(
@@ -457,13 +481,20 @@ async def delete_document(
 ):
     """Delete a document"""
     
+    owned_document = (
+        Document.id == document_id,
+        Document.owner_id == current_user.id
+    )
+    
+    # Bulk-delete the chunks and workflow links rather than letting the ORM
+    # cascade load every chunk (content and embedding) just to delete it
+    owned_document_ids = select(Document.id).where(*owned_document)
+    await db.execute(delete(DocumentChunk).where(DocumentChunk.document_id.in_(owned_document_ids)))
+    await db.execute(delete(WorkflowDocument).where(WorkflowDocument.document_id.in_(owned_document_ids)))
     result = await db.execute(
-        select(Document).where(
-            Document.id == document_id,
-            Document.owner_id == current_user.id
-        )
+        delete(Document).where(*owned_document).returning(Document.file_path, Document.file_size)
     )
-    document = result.scalar_one_or_none()
+    document = result.one_or_none()
     
     if not document:
         raise HTTPException(
@@ -471,16 +502,18 @@ async def delete_document(
             detail="Document not found"
         )
     
-    # Delete file from disk
+    await db.execute(
+        user_counter_update(current_user.id, document_count=-1, total_storage_bytes=-document.file_size)
+    )
+    await db.commit()
+    invalidate_user_documents(current_user.id)
+    
+    # Delete file from disk once the rows are gone
     try:
         if os.path.exists(document.file_path):
             os.remove(document.file_path)
     except Exception as e:
-        print(f"Warning: Failed to delete file from disk: {e}")
-    
-    # Delete from database (will cascade delete chunks)
-    await db.delete(document)
-    await db.commit()
+        logger.warning(f"Failed to delete file from disk: {e}")
     
     return BaseResponse(message="Document deleted successfully")
 
@@ -514,10 +547,9 @@ async def analyze_document(
         )
     
     try:
-        start_time = datetime.utcnow()
+        started = time.perf_counter()
         analysis = await gemini_service.analyze_document(document.content)
-        end_time = datetime.utcnow()
-        processing_time = (end_time - start_time).total_seconds()
+        processing_time = time.perf_counter() - started
         
         # Update document with analysis results
         if analysis_request.generate_summary:
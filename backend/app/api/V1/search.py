@@ -3,13 +3,13 @@ Search API endpoints for document similarity search
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
 from typing import List, Optional
 import uuid
 import time
-import numpy as np
 
-from app.core.database import get_db
+from app.core.cache import similar_documents_cache, document_generation
+from app.core.database import get_db, widen_hnsw_search
 from app.models.orm_models import Document, DocumentChunk, User
 from app.models.schemas import (
     SearchRequest, SearchResponse, SearchResult, BaseResponse
@@ -19,25 +19,65 @@ from app.services.embeddings_service import embedding_service
 
 router = APIRouter()
 
-def calculate_cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
-    """Calculate cosine similarity between two vectors"""
-    try:
-        # Convert to numpy arrays
-        a = np.array(vec1)
-        b = np.array(vec2)
-        
-        # Calculate cosine similarity
-        dot_product = np.dot(a, b)
-        norm_a = np.linalg.norm(a)
-        norm_b = np.linalg.norm(b)
-        
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
-        
-        similarity = dot_product / (norm_a * norm_b)
-        return float(similarity)
-    except Exception:
-        return 0.0
+async def search_by_vector(
+    db: AsyncSession,
+    query_embedding: List[float],
+    owner_id: uuid.UUID,
+    limit: int,
+    document_ids: Optional[List[uuid.UUID]] = None,
+    exclude_document_id: Optional[uuid.UUID] = None
+) -> List[SearchResult]:
+    """Chunks of owner_id's documents nearest to query_embedding by cosine distance"""
+    
+    distance = DocumentChunk.embedding.cosine_distance(query_embedding)
+    # Only the columns a result needs; never the document's full content
+    chunk_query = select(
+        DocumentChunk.content,
+        DocumentChunk.chunk_index,
+        Document.id.label("document_id"),
+        Document.title,
+        Document.filename,
+        Document.file_type,
+        distance.label("distance")
+    ).join(
+        Document, DocumentChunk.document_id == Document.id
+    ).where(
+        Document.owner_id == owner_id,
+        DocumentChunk.embedding.isnot(None),
+        # Only include results above a minimum similarity of 0.1
+        distance < 0.9
+    )
+    
+    if exclude_document_id:
+        chunk_query = chunk_query.where(Document.id != exclude_document_id)
+    
+    if document_ids:
+        # A handful of documents: rank their chunks exactly (+ 0 keeps the
+        # planner off the HNSW index, whose candidates the filter would discard)
+        chunk_query = chunk_query.where(Document.id.in_(document_ids)).order_by(distance + 0)
+    else:
+        # Nearest chunks by cosine distance, served by the HNSW index
+        await widen_hnsw_search(db, limit)
+        chunk_query = chunk_query.order_by(distance)
+    
+    result = await db.execute(chunk_query.limit(limit))
+    
+    search_results = []
+    for row in result.all():
+        similarity = 1 - row.distance
+        search_results.append(SearchResult(
+            document_id=row.document_id,
+            document_title=row.title,
+            chunk_content=row.content[:500] + "..." if len(row.content) > 500 else row.content,
+            similarity_score=similarity,
+            metadata={
+                "chunk_index": row.chunk_index,
+                "document_filename": row.filename,
+                "document_type": row.file_type
+            }
+        ))
+    
+    return search_results
 
 @router.post("/", response_model=SearchResponse)
 async def search_documents(
@@ -53,48 +93,11 @@ async def search_documents(
         # Generate embedding for search query
         query_embedding = await embedding_service.create_embedding(search_request.query)
         
-        # Build query to get document chunks
-        chunk_query = select(DocumentChunk, Document).join(
-            Document, DocumentChunk.document_id == Document.id
-        ).where(
-            Document.owner_id == current_user.id,
-            DocumentChunk.embedding.isnot(None)
+        search_results = await search_by_vector(
+            db, query_embedding, current_user.id, search_request.limit,
+            document_ids=search_request.document_ids
         )
         
-        # Filter by specific documents if requested
-        if search_request.document_ids:
-            chunk_query = chunk_query.where(Document.id.in_(search_request.document_ids))
-        
-        result = await db.execute(chunk_query)
-        chunks_with_docs = result.all()
-        
-        # Calculate similarities
-        search_results = []
-        for chunk, document in chunks_with_docs:
-            if chunk.embedding:
-                similarity = calculate_cosine_similarity(query_embedding, chunk.embedding)
-                
-                # Only include results above a minimum threshold
-                if similarity > 0.1:  # Adjust threshold as needed
-                    search_result = SearchResult(
-                        document_id=document.id,
-                        document_title=document.title,
-                        chunk_content=chunk.content[:500] + "..." if len(chunk.content) > 500 else chunk.content,
-                        similarity_score=similarity,
-                        metadata={
-                            "chunk_index": chunk.chunk_index,
-                            "document_filename": document.filename,
-                            "document_type": document.file_type
-                        }
-                    )
-                    search_results.append(search_result)
-        
-        # Sort by similarity score (highest first)
-        search_results.sort(key=lambda x: x.similarity_score, reverse=True)
-        
-        # Limit results
-        search_results = search_results[:search_request.limit]
-        
         end_time = time.time()
         search_time_ms = (end_time - start_time) * 1000
         
@@ -123,14 +126,34 @@ async def find_similar_documents(
     
     start_time = time.time()
     
-    # Get the source document
-    doc_result = await db.execute(
-        select(Document).where(
+    # The result only depends on the user's documents, so repeat requests reuse it
+    # until any of those documents is uploaded, changed or deleted
+    cache_key = (current_user.id, document_generation(current_user.id), document_id, limit)
+    cached = similar_documents_cache.get(cache_key)
+    if cached is not None:
+        query, similar_results = cached
+        return SearchResponse(
+            message="Similar documents found successfully",
+            results=similar_results,
+            query=query,
+            total_results=len(similar_results),
+            search_time_ms=(time.time() - start_time) * 1000
+        )
+    
+    # Get the source document with the mean of its chunk embeddings, which
+    # stands in for the whole document without another embedding API call
+    source_result = await db.execute(
+        select(
+            Document.title,
+            func.avg(DocumentChunk.embedding).label("embedding")
+        ).outerjoin(
+            DocumentChunk, DocumentChunk.document_id == Document.id
+        ).where(
             Document.id == document_id,
             Document.owner_id == current_user.id
-        )
+        ).group_by(Document.id)
     )
-    source_document = doc_result.scalar_one_or_none()
+    source_document = source_result.one_or_none()
     
     if not source_document:
         raise HTTPException(
@@ -138,39 +161,31 @@ async def find_similar_documents(
             detail="Document not found"
         )
     
-    if not source_document.content:
+    if source_document.embedding is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Source document has no content"
+            detail="Source document has no embedded content"
         )
     
     try:
-        # Use document content as search query
-        search_request = SearchRequest(
-            query=source_document.content[:1000],  # Use first 1000 chars
-            limit=limit + 1,  # +1 to exclude the source document
-            include_content=True
+        similar_results = await search_by_vector(
+            db, source_document.embedding, current_user.id, limit,
+            exclude_document_id=document_id
         )
         
-        # Perform search
-        search_results = await search_documents(search_request, current_user, db)
-        
-        # Filter out the source document from results
-        filtered_results = [
-            result for result in search_results.results 
-            if result.document_id != document_id
-        ][:limit]
-        
         end_time = time.time()
         search_time_ms = (end_time - start_time) * 1000
         
-        return SearchResponse(
+        similar_response = SearchResponse(
             message="Similar documents found successfully",
-            results=filtered_results,
+            results=similar_results,
             query=f"Similar to: {source_document.title}",
-            total_results=len(filtered_results),
+            total_results=len(similar_results),
             search_time_ms=search_time_ms
         )
+        similar_documents_cache.set(cache_key, (similar_response.query, similar_results))
+        
+        return similar_response
         
     except Exception as e:
         raise HTTPException(
@@ -187,26 +202,35 @@ async def get_search_suggestions(
 ):
     """Get search suggestions based on document titles and content"""
     
-    # Simple text-based suggestions from document titles
+    # Titles containing or resembling the query (trigram index), documents whose
+    # text matches it (full-text index), or summaries containing it (the source
+    # of snippet suggestions; unindexed, but limited to the owner's rows), closest titles first
     result = await db.execute(
         select(Document.title, Document.summary).where(
             Document.owner_id == current_user.id,
-            (Document.title.ilike(f"%{q}%") | Document.summary.ilike(f"%{q}%"))
-        ).limit(limit)
+            Document.title.ilike(f"%{q}%")
+            | Document.title.op("%")(q)
+            | Document.content_tsv.match(q, postgresql_regconfig="english")
+            | Document.summary.ilike(f"%{q}%")
+        ).order_by(Document.title.op("<->")(q)).limit(limit)
     )
     
-    suggestions = []
+    q_lower = q.lower()
+    # Dict keys drop duplicates while keeping the ranking order
+    suggestions = {}
     for title, summary in result:
-        suggestions.append(title)
-        if summary and q.lower() in summary.lower():
+        suggestions[title] = None
+        if summary and q_lower in summary.lower():
             # Extract relevant snippet from summary
             words = summary.split()
             for i, word in enumerate(words):
-                if q.lower() in word.lower():
+                if q_lower in word.lower():
                     start = max(0, i - 3)
                     end = min(len(words), i + 4)
-                    snippet = " ".join(words[start:end])
-                    suggestions.append(snippet)
+                    suggestions[" ".join(words[start:end])] = None
                     break
+        
+        if len(suggestions) >= limit:
+            break
     
-    return list(set(suggestions))[:limit]  # Remove duplicates and limit
\ No newline at end of file
+    return list(suggestions)[:limit]
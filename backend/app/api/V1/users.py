@@ -3,15 +3,15 @@ User management API endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, exists, update
 from typing import List, Optional
 import uuid
 
 from app.core.database import get_db
-from app.models.orm_models import User, Document, Workflow, ChatSession
+from app.models.orm_models import User
 from app.models.schemas import (
     UserResponse, UserUpdate, BaseResponse, UserStatsResponse,
-    ErrorResponse
+    ErrorResponse, user_list_adapter, construct_from_row
 )
 from app.api.V1.auth import get_current_active_user, get_password_hash
 
@@ -20,7 +20,7 @@ router = APIRouter()
 @router.get("/profile", response_model=UserResponse)
 async def get_user_profile(current_user: User = Depends(get_current_active_user)):
     """Get current user profile"""
-    return UserResponse.model_validate(current_user)
+    return construct_from_row(UserResponse, current_user)
 
 @router.put("/profile", response_model=UserResponse)
 async def update_user_profile(
@@ -32,60 +32,36 @@ async def update_user_profile(
     
     # Check if email is being changed and if it's already taken
     if user_update.email and user_update.email != current_user.email:
-        result = await db.execute(select(User).where(User.email == user_update.email))
-        existing_user = result.scalar_one_or_none()
-        if existing_user:
+        # Only existence matters; the unique email index answers it without loading a row
+        email_taken = await db.scalar(select(exists().where(User.email == user_update.email)))
+        if email_taken:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already taken"
             )
     
-    # Update user fields
-    update_data = user_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(current_user, field, value)
-    
-    await db.commit()
-    await db.refresh(current_user)
+    # Update user fields; RETURNING refreshes the already-loaded user in place
+    update_data = user_update.model_dump(exclude_unset=True)
+    if update_data:
+        await db.execute(
+            update(User).where(User.id == current_user.id).values(**update_data).returning(User)
+        )
+        await db.commit()
     
-    return UserResponse.model_validate(current_user)
+    return construct_from_row(UserResponse, current_user)
 
 @router.get("/stats", response_model=UserStatsResponse)
 async def get_user_stats(
-    current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_active_user)
 ):
     """Get user statistics"""
     
-    # Count documents
-    doc_result = await db.execute(
-        select(func.count(Document.id)).where(Document.owner_id == current_user.id)
-    )
-    total_documents = doc_result.scalar()
-    
-    # Count workflows
-    wf_result = await db.execute(
-        select(func.count(Workflow.id)).where(Workflow.owner_id == current_user.id)
-    )
-    total_workflows = wf_result.scalar()
-    
-    # Count chat sessions
-    chat_result = await db.execute(
-        select(func.count(ChatSession.id)).where(ChatSession.user_id == current_user.id)
-    )
-    total_chat_sessions = chat_result.scalar()
-    
-    # Calculate storage used (sum of file sizes)
-    storage_result = await db.execute(
-        select(func.coalesce(func.sum(Document.file_size), 0)).where(Document.owner_id == current_user.id)
-    )
-    storage_used_bytes = storage_result.scalar()
-    
+    # Counters are maintained on the user row, which auth has already loaded
     return UserStatsResponse(
-        total_documents=total_documents,
-        total_workflows=total_workflows,
-        total_chat_sessions=total_chat_sessions,
-        storage_used_bytes=storage_used_bytes,
+        total_documents=current_user.document_count,
+        total_workflows=current_user.workflow_count,
+        total_chat_sessions=current_user.chat_session_count,
+        storage_used_bytes=current_user.total_storage_bytes,
         last_activity=current_user.last_login
     )
 
@@ -130,12 +106,10 @@ async def get_all_users(
             detail="Not enough permissions"
         )
     
-    result = await db.execute(
-        select(User).offset(skip).limit(limit)
-    )
-    users = result.scalars().all()
+    # A page is at most 1000 rows, small enough to fetch whole
+    result = await db.scalars(select(User).offset(skip).limit(limit))
     
-    return [UserResponse.model_validate(user) for user in users]
+    return user_list_adapter.validate_python(result.all(), from_attributes=True)
 
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user_by_id(
@@ -160,7 +134,7 @@ async def get_user_by_id(
             detail="User not found"
         )
     
-    return UserResponse.model_validate(user)
+    return construct_from_row(UserResponse, user)
 
 @router.put("/{user_id}/admin", response_model=BaseResponse)
 async def toggle_admin_status(
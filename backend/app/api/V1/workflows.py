@@ -1,24 +1,35 @@
 """
 Workflow management API endpoints for the No-Code/Low-Code workflow builder
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy.orm import load_only
+from sqlalchemy import select, func, update, delete
 from typing import List, Optional, Dict, Any
 import uuid
+import orjson
+import hashlib
+import time
+import logging
 from datetime import datetime
 
 from app.core.database import get_db
-from app.models.orm_models import Workflow, WorkflowExecution, User, Document
+from app.core.routing import ORJSONRoute
+from app.core.cache import workflow_validation_cache
+from app.models.orm_models import Workflow, WorkflowExecution, WorkflowDocument, User, Document, user_counter_update, uuid7
 from app.models.schemas import (
     WorkflowCreate, WorkflowUpdate, WorkflowResponse, WorkflowListResponse,
-    WorkflowExecutionRequest, WorkflowExecutionResponse, BaseResponse
+    WorkflowExecutionRequest, WorkflowExecutionResponse, BaseResponse, workflow_list_adapter,
+    construct_from_row
 )
-from app.api.V1.auth import get_current_active_user
+from app.api.V1.auth import get_current_active_user, get_default_user_id
 from app.services.workflow_engine import WorkflowEngine
 from app.services.gemini_service import gemini_service
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Workflow definitions can be large JSON bodies; parse them with orjson
+router = APIRouter(route_class=ORJSONRoute)
 
 # Component types for validation
 REQUIRED_COMPONENTS = ["UserQuery", "KnowledgeBase", "LLMEngine", "Output"]
@@ -41,8 +52,74 @@ COMPONENT_CONFIGS = {
     }
 }
 
+# Required fields per component type, resolved once; types with none are skipped entirely
+REQUIRED_COMPONENT_FIELDS = {
+    component_type: tuple(config["required_fields"])
+    for component_type, config in COMPONENT_CONFIGS.items()
+    if config["required_fields"]
+}
+
+# Palette shown by the workflow builder
+AVAILABLE_COMPONENTS = {
+    "components": [
+        {
+            "type": "UserQuery",
+            "name": "User Query",
+            "description": "Entry point for user queries",
+            "category": "input",
+            "config": COMPONENT_CONFIGS["UserQuery"],
+            "icon": "user",
+            "color": "#3B82F6"
+        },
+        {
+            "type": "KnowledgeBase",
+            "name": "Knowledge Base",
+            "description": "Document storage and retrieval",
+            "category": "data",
+            "config": COMPONENT_CONFIGS["KnowledgeBase"],
+            "icon": "database",
+            "color": "#10B981"
+        },
+        {
+            "type": "LLMEngine",
+            "name": "LLM Engine",
+            "description": "AI language model processing",
+            "category": "processing",
+            "config": COMPONENT_CONFIGS["LLMEngine"],
+            "icon": "brain",
+            "color": "#8B5CF6"
+        },
+        {
+            "type": "Output",
+            "name": "Output",
+            "description": "Display results to user",
+            "category": "output",
+            "config": COMPONENT_CONFIGS["Output"],
+            "icon": "monitor",
+            "color": "#F59E0B"
+        }
+    ]
+}
+
+AVAILABLE_COMPONENTS_JSON = orjson.dumps(AVAILABLE_COMPONENTS)
+
 def validate_workflow(nodes: List[Dict], edges: List[Dict]) -> Dict[str, Any]:
     """Validate workflow structure and components"""
+    # Graphs are usually re-validated unchanged (edits to name/config, executions),
+    # so results are memoized on a hash of the serialized graph
+    cache_key = hashlib.sha256(orjson.dumps([nodes, edges], option=orjson.OPT_SORT_KEYS)).digest()
+    validation_result = workflow_validation_cache.get(cache_key)
+    if validation_result is None:
+        validation_result = _validate_workflow_graph(nodes, edges)
+        workflow_validation_cache.set(cache_key, validation_result)
+    return {
+        "valid": validation_result["valid"],
+        "errors": list(validation_result["errors"]),
+        "warnings": list(validation_result["warnings"])
+    }
+
+def _validate_workflow_graph(nodes: List[Dict], edges: List[Dict]) -> Dict[str, Any]:
+    """Validate a workflow's nodes and edges"""
     validation_result = {
         "valid": True,
         "errors": [],
@@ -50,7 +127,7 @@ def validate_workflow(nodes: List[Dict], edges: List[Dict]) -> Dict[str, Any]:
     }
     
     # Check if required components exist
-    node_types = [node.get("type") for node in nodes]
+    node_types = {node.get("type") for node in nodes}
     
     # Must have UserQuery as entry point
     if "UserQuery" not in node_types:
@@ -65,19 +142,19 @@ def validate_workflow(nodes: List[Dict], edges: List[Dict]) -> Dict[str, Any]:
     # Validate component configurations
     for node in nodes:
         node_type = node.get("type")
-        if node_type in COMPONENT_CONFIGS:
+        required_fields = REQUIRED_COMPONENT_FIELDS.get(node_type)
+        if required_fields:
             config = node.get("data", {})
-            component_config = COMPONENT_CONFIGS[node_type]
             
             # Check required fields
-            for field in component_config["required_fields"]:
+            for field in required_fields:
                 if field not in config:
                     validation_result["errors"].append(
                         f"{node_type} component missing required field: {field}"
                     )
     
     # Validate connections (edges)
-    node_ids = [node.get("id") for node in nodes]
+    node_ids = {node.get("id") for node in nodes}
     for edge in edges:
         source = edge.get("source")
         target = edge.get("target")
@@ -100,8 +177,12 @@ async def create_workflow(
 ):
     """Create a new workflow"""
     
+    # Nodes and edges are stored as plain JSON
+    nodes = [node.model_dump() for node in workflow_data.nodes]
+    edges = [edge.model_dump() for edge in workflow_data.edges]
+    
     # Validate workflow structure
-    validation = validate_workflow(workflow_data.nodes, workflow_data.edges)
+    validation = validate_workflow(nodes, edges)
     if not validation["valid"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -109,21 +190,22 @@ async def create_workflow(
         )
     
     workflow = Workflow(
-        id=uuid.uuid4(),
+        id=uuid7(),
         name=workflow_data.name,
         description=workflow_data.description,
-        nodes=workflow_data.nodes,
-        edges=workflow_data.edges,
+        nodes=nodes,
+        edges=edges,
         config=workflow_data.config,
         owner_id=current_user.id,
         status="draft"
     )
     
     db.add(workflow)
+    await db.execute(user_counter_update(current_user.id, workflow_count=1))
+    # created_at comes back in the INSERT's RETURNING clause, no refresh needed
     await db.commit()
-    await db.refresh(workflow)
     
-    return WorkflowResponse.model_validate(workflow)
+    return construct_from_row(WorkflowResponse, workflow)
 
 @router.get("/", response_model=WorkflowListResponse)
 async def get_workflows(
@@ -132,18 +214,26 @@ async def get_workflows(
 ):
     """Get all workflows for current user"""
     
+    # Skip the nodes/edges/config JSON, which the listing doesn't return
     result = await db.execute(
         select(Workflow)
+        .options(load_only(
+            Workflow.id, Workflow.name, Workflow.description, Workflow.status,
+            Workflow.execution_count, Workflow.last_executed, Workflow.created_at,
+            Workflow.updated_at, Workflow.owner_id
+        ))
         .where(Workflow.owner_id == current_user.id)
         .order_by(Workflow.updated_at.desc())
     )
     workflows = result.scalars().all()
     
-    return WorkflowListResponse(
+    # Serialize the model straight to JSON bytes, skipping the intermediate dict
+    workflow_list = WorkflowListResponse(
         message="Workflows retrieved successfully",
-        workflows=[WorkflowResponse.model_validate(wf) for wf in workflows],
+        workflows=workflow_list_adapter.validate_python(workflows, from_attributes=True),
         total=len(workflows)
     )
+    return Response(content=workflow_list.model_dump_json(), media_type="application/json")
 
 @router.get("/{workflow_id}", response_model=WorkflowResponse)
 async def get_workflow(
@@ -167,7 +257,7 @@ async def get_workflow(
             detail="Workflow not found"
         )
     
-    return WorkflowResponse.model_validate(workflow)
+    return construct_from_row(WorkflowResponse, workflow)
 
 @router.put("/{workflow_id}", response_model=WorkflowResponse)
 async def update_workflow(
@@ -178,38 +268,41 @@ async def update_workflow(
 ):
     """Update a workflow"""
     
-    result = await db.execute(
-        select(Workflow).where(
-            Workflow.id == workflow_id,
-            Workflow.owner_id == current_user.id
-        )
+    owned_workflow = (
+        Workflow.id == workflow_id,
+        Workflow.owner_id == current_user.id
     )
-    workflow = result.scalar_one_or_none()
     
-    if not workflow:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Workflow not found"
-        )
+    # Nested nodes/edges become plain JSON for the JSON columns
+    update_data = workflow_update.model_dump(exclude_unset=True)
     
     # Validate if nodes/edges are being updated
-    if workflow_update.nodes is not None and workflow_update.edges is not None:
-        validation = validate_workflow(workflow_update.nodes, workflow_update.edges)
+    if update_data.get("nodes") is not None and update_data.get("edges") is not None:
+        validation = validate_workflow(update_data["nodes"], update_data["edges"])
         if not validation["valid"]:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={"message": "Workflow validation failed", "errors": validation["errors"]}
             )
     
-    # Update workflow fields
-    update_data = workflow_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(workflow, field, value)
+    # Update workflow fields, checking ownership in the same statement
+    if update_data:
+        result = await db.execute(
+            update(Workflow).where(*owned_workflow).values(**update_data).returning(Workflow)
+        )
+    else:
+        result = await db.execute(select(Workflow).where(*owned_workflow))
+    workflow = result.scalar_one_or_none()
+    
+    if not workflow:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Workflow not found"
+        )
     
     await db.commit()
-    await db.refresh(workflow)
     
-    return WorkflowResponse.model_validate(workflow)
+    return construct_from_row(WorkflowResponse, workflow)
 
 @router.delete("/{workflow_id}", response_model=BaseResponse)
 async def delete_workflow(
@@ -219,21 +312,26 @@ async def delete_workflow(
 ):
     """Delete a workflow"""
     
+    owned_workflow = (
+        Workflow.id == workflow_id,
+        Workflow.owner_id == current_user.id
+    )
+    
+    # Dependent rows first (the foreign keys have no ON DELETE CASCADE), then the workflow
+    owned_workflow_ids = select(Workflow.id).where(*owned_workflow)
+    await db.execute(delete(WorkflowExecution).where(WorkflowExecution.workflow_id.in_(owned_workflow_ids)))
+    await db.execute(delete(WorkflowDocument).where(WorkflowDocument.workflow_id.in_(owned_workflow_ids)))
     result = await db.execute(
-        select(Workflow).where(
-            Workflow.id == workflow_id,
-            Workflow.owner_id == current_user.id
-        )
+        delete(Workflow).where(*owned_workflow).returning(Workflow.id)
     )
-    workflow = result.scalar_one_or_none()
     
-    if not workflow:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Workflow not found"
         )
     
-    await db.delete(workflow)
+    await db.execute(user_counter_update(current_user.id, workflow_count=-1))
     await db.commit()
     
     return BaseResponse(message="Workflow deleted successfully")
@@ -246,13 +344,16 @@ async def validate_workflow_endpoint(
 ):
     """Validate a workflow (Build Stack functionality)"""
     
+    owned_workflow = (
+        Workflow.id == workflow_id,
+        Workflow.owner_id == current_user.id
+    )
+    
+    # Validation needs the graph, but not the rest of the row
     result = await db.execute(
-        select(Workflow).where(
-            Workflow.id == workflow_id,
-            Workflow.owner_id == current_user.id
-        )
+        select(Workflow.nodes, Workflow.edges, Workflow.status).where(*owned_workflow)
     )
-    workflow = result.scalar_one_or_none()
+    workflow = result.one_or_none()
     
     if not workflow:
         raise HTTPException(
@@ -262,18 +363,16 @@ async def validate_workflow_endpoint(
     
     validation = validate_workflow(workflow.nodes or [], workflow.edges or [])
     
-    # Update workflow status based on validation
-    if validation["valid"]:
-        workflow.status = "active"
-    else:
-        workflow.status = "invalid"
-    
-    await db.commit()
+    # Update workflow status based on validation, only writing when it changes
+    workflow_status = "active" if validation["valid"] else "invalid"
+    if workflow_status != workflow.status:
+        await db.execute(update(Workflow).where(*owned_workflow).values(status=workflow_status))
+        await db.commit()
     
     return {
         "workflow_id": workflow_id,
         "validation": validation,
-        "status": workflow.status,
+        "status": workflow_status,
         "message": "Workflow validated successfully" if validation["valid"] else "Workflow validation failed"
     }
 
@@ -307,10 +406,11 @@ async def execute_workflow(
         )
     
     start_time = datetime.utcnow()
+    started = time.perf_counter()
     
     # Create execution record
     execution = WorkflowExecution(
-        id=uuid.uuid4(),
+        id=uuid7(),
         workflow_id=workflow_id,
         input_data=execution_request.input_data,
         status="running",
@@ -322,7 +422,7 @@ async def execute_workflow(
     
     try:
         # Initialize workflow engine
-        engine = WorkflowEngine(db, current_user)
+        engine = WorkflowEngine(db, current_user.id)
         
         # Execute workflow
         result = await engine.execute_workflow(
@@ -331,8 +431,9 @@ async def execute_workflow(
             execution_request.input_data or {}
         )
         
+        # Monotonic clock for the duration; wall clock only for the stored timestamps
+        duration = time.perf_counter() - started
         end_time = datetime.utcnow()
-        duration = (end_time - start_time).total_seconds()
         
         # Update execution record
         execution.status = "completed"
@@ -390,11 +491,11 @@ async def run_workflow_direct(
             detail={"message": "Workflow validation failed", "errors": validation["errors"]}
         )
     
-    start_time = datetime.utcnow()
+    started = time.perf_counter()
     
     try:
         # Initialize workflow engine
-        engine = WorkflowEngine(db, current_user)
+        engine = WorkflowEngine(db, current_user.id)
         
         # Prepare input data
         input_data = {
@@ -405,8 +506,7 @@ async def run_workflow_direct(
         # Execute workflow
         result = await engine.execute_workflow(nodes, edges, input_data)
         
-        end_time = datetime.utcnow()
-        duration = (end_time - start_time).total_seconds()
+        duration = time.perf_counter() - started
         
         return {
             "message": "Workflow executed successfully",
@@ -421,6 +521,32 @@ async def run_workflow_direct(
             detail=f"Workflow execution failed: {str(e)}"
         )
 
+async def _simple_chat(query: str, custom_prompt: Optional[str]) -> Dict[str, Any]:
+    """Answer a query with a single Gemini call, without building a workflow"""
+    
+    started = time.perf_counter()
+    try:
+        response = await gemini_service.generate_text(
+            f"{custom_prompt}\n\nUser Query: {query}" if custom_prompt else query
+        )
+        return {
+            "message": "Response generated",
+            "status": "completed",
+            "answer": response,
+            "output_data": {"answer": response},
+            "duration_seconds": time.perf_counter() - started
+        }
+    except Exception as e:
+        logger.warning(f"Simple chat failed: {e}")
+        # Final fallback - return a helpful message
+        return {
+            "message": "Service temporarily unavailable",
+            "status": "completed",
+            "answer": "I apologize, but the AI service is currently unavailable. Please ensure the Gemini API key is configured properly in the backend environment. You can still build and test workflows, but AI responses require proper API configuration.",
+            "output_data": {"answer": "Service configuration needed"},
+            "duration_seconds": time.perf_counter() - started
+        }
+
 @router.post("/run-public", response_model=Dict[str, Any])
 async def run_workflow_public(
     workflow_data: Dict[str, Any] = Body(...),
@@ -428,16 +554,6 @@ async def run_workflow_public(
 ):
     """Direct workflow execution endpoint (public for testing)"""
     
-    # Get default user for public workflows
-    result = await db.execute(select(User).where(User.username == "admin"))
-    default_user = result.scalar_one_or_none()
-    
-    if not default_user:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Default user not found. Please ensure database is initialized."
-        )
-    
     definition = workflow_data.get("definition", {})
     query = workflow_data.get("query", "")
     custom_prompt = workflow_data.get("custom_prompt")
@@ -445,38 +561,19 @@ async def run_workflow_public(
     nodes = definition.get("nodes", [])
     edges = definition.get("edges", [])
     
-    # For simple chat, create a basic workflow if none provided
+    # Simple chat: with no workflow to run, a UserQuery -> LLMEngine -> Output
+    # graph would only wrap one Gemini call, so make that call directly
     if not nodes:
-        nodes = [
-            {
-                "id": "1",
-                "type": "UserQuery",
-                "data": {"label": "User Query"},
-                "position": {"x": 250, "y": 25}
-            },
-            {
-                "id": "2",
-                "type": "LLMEngine",
-                "data": {"label": "AI Processing"},
-                "position": {"x": 250, "y": 125}
-            },
-            {
-                "id": "3",
-                "type": "Output",
-                "data": {"label": "Response"},
-                "position": {"x": 250, "y": 225}
-            }
-        ]
-        edges = [
-            {"id": "e1-2", "source": "1", "target": "2"},
-            {"id": "e2-3", "source": "2", "target": "3"}
-        ]
+        return await _simple_chat(query, custom_prompt)
     
-    start_time = datetime.utcnow()
+    # Public workflows run as the default admin user
+    default_user_id = await get_default_user_id(db)
+    
+    started = time.perf_counter()
     
     try:
         # Initialize workflow engine
-        engine = WorkflowEngine(db, default_user)
+        engine = WorkflowEngine(db, default_user_id)
         
         # Prepare input data
         input_data = {
@@ -487,8 +584,7 @@ async def run_workflow_public(
         # Execute workflow
         result = await engine.execute_workflow(nodes, edges, input_data)
         
-        end_time = datetime.utcnow()
-        duration = (end_time - start_time).total_seconds()
+        duration = time.perf_counter() - started
         
         return {
             "message": "Workflow executed successfully",
@@ -501,68 +597,15 @@ async def run_workflow_public(
     except Exception as e:
         print(f"Workflow execution error: {e}")
         # Fallback to simple Gemini response
-        try:
-            response = await gemini_service.generate_text(
-                f"{custom_prompt}\n\nUser Query: {query}" if custom_prompt else query
-            )
-            return {
-                "message": "Fallback response generated",
-                "status": "completed",
-                "answer": response,
-                "output_data": {"answer": response},
-                "duration_seconds": 1.0
-            }
-        except Exception as fallback_error:
-            # Final fallback - return a helpful message
-            return {
-                "message": "Service temporarily unavailable",
-                "status": "completed",
-                "answer": "I apologize, but the AI service is currently unavailable. Please ensure the Gemini API key is configured properly in the backend environment. You can still build and test workflows, but AI responses require proper API configuration.",
-                "output_data": {"answer": "Service configuration needed"},
-                "duration_seconds": 0.1
-            }
+        return await _simple_chat(query, custom_prompt)
 
 @router.get("/components/available", response_model=Dict[str, Any])
 async def get_available_components():
     """Get available workflow components and their configurations"""
     
-    return {
-        "components": [
-            {
-                "type": "UserQuery",
-                "name": "User Query",
-                "description": "Entry point for user queries",
-                "category": "input",
-                "config": COMPONENT_CONFIGS["UserQuery"],
-                "icon": "user",
-                "color": "#3B82F6"
-            },
-            {
-                "type": "KnowledgeBase",
-                "name": "Knowledge Base",
-                "description": "Document storage and retrieval",
-                "category": "data",
-                "config": COMPONENT_CONFIGS["KnowledgeBase"],
-                "icon": "database",
-                "color": "#10B981"
-            },
-            {
-                "type": "LLMEngine",
-                "name": "LLM Engine",
-                "description": "AI language model processing",
-                "category": "processing",
-                "config": COMPONENT_CONFIGS["LLMEngine"],
-                "icon": "brain",
-                "color": "#8B5CF6"
-            },
-            {
-                "type": "Output",
-                "name": "Output",
-                "description": "Display results to user",
-                "category": "output",
-                "config": COMPONENT_CONFIGS["Output"],
-                "icon": "monitor",
-                "color": "#F59E0B"
-            }
-        ]
-    }
+    # Static payload, serialized once at import time
+    return Response(
+        content=AVAILABLE_COMPONENTS_JSON,
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=3600"}
+    )
@@ -0,0 +1,99 @@
+"""
+In-process TTL caching for read-mostly data
+"""
+import hashlib
+import random
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.core.config import settings
+
+
+class TTLCache:
+    """
+    Dictionary cache whose entries expire after a jittered time-to-live.
+    The jitter spreads out expiries so hot keys don't all miss at once.
+    When full, the least recently used entry is evicted.
+    """
+
+    def __init__(self, ttl_seconds: float, jitter: float = 0.1, maxsize: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.jitter = jitter
+        self.maxsize = maxsize
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+
+        # Move the hit to the back so eviction takes the least recently used key
+        self._entries[key] = self._entries.pop(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value for roughly ttl_seconds (defaults to the cache TTL)"""
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        ttl *= random.uniform(1 - self.jitter, 1 + self.jitter)
+
+        if key not in self._entries and len(self._entries) >= self.maxsize:
+            # Drop the least recently used entry (dicts keep insertion order)
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (time.monotonic() + ttl, value)
+
+    def delete(self, key: Hashable):
+        """Remove a key if present"""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove every entry"""
+        self._entries.clear()
+
+
+# Dashboard statistics
+stats_cache = TTLCache(ttl_seconds=settings.STATS_CACHE_TTL_SECONDS)
+
+SYSTEM_STATS_KEY = "stats:system"
+
+# Health probe results, so dashboard polling doesn't hit upstream services every time
+health_cache = TTLCache(ttl_seconds=settings.HEALTH_CACHE_TTL_SECONDS)
+
+GEMINI_HEALTH_KEY = "health:gemini"
+DATABASE_HEALTH_KEY = "health:database"
+
+# Gemini embeddings and document analyses, keyed by a hash of their input text.
+# Embeddings are stored as numpy arrays, a fraction of the size of float lists
+embedding_cache = TTLCache(ttl_seconds=settings.AI_RESULT_CACHE_TTL_SECONDS, maxsize=5000)
+analysis_cache = TTLCache(ttl_seconds=settings.AI_RESULT_CACHE_TTL_SECONDS, maxsize=1000)
+
+# Workflow graph validation results, keyed by a hash of the serialized graph
+workflow_validation_cache = TTLCache(ttl_seconds=3600, maxsize=128)
+
+# "Similar documents" results per (user, document generation, document, limit)
+similar_documents_cache = TTLCache(ttl_seconds=settings.SIMILAR_DOCUMENTS_CACHE_TTL_SECONDS)
+
+# Per-user counter bumped whenever their documents change. It is part of the
+# similar-documents key, so results computed over an older corpus are never served
+_document_generations: Dict[Hashable, int] = {}
+
+
+def document_generation(user_id: Hashable) -> int:
+    """Current generation of user_id's documents"""
+    return _document_generations.get(user_id, 0)
+
+
+def invalidate_user_documents(user_id: Hashable):
+    """Make cached results over user_id's documents unreachable"""
+    _document_generations[user_id] = document_generation(user_id) + 1
+
+
+def text_key(text: str) -> str:
+    """Compact cache key for arbitrarily long input text"""
+    return hashlib.sha256(text.strip().encode()).hexdigest()
+
@@ -2,21 +2,40 @@
 Database configuration and session management for PostgreSQL
 """
 import os
+import asyncio
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
-from sqlalchemy import MetaData, text
-from typing import AsyncGenerator
+from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy import MetaData, func, select, text
+from typing import AsyncGenerator, List
 import asyncpg
 from app.core.config import settings
+from app.core.cache import health_cache, DATABASE_HEALTH_KEY
 
 # Create SQLAlchemy engine
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
-    pool_size=settings.DB_POOL_SIZE,
-    max_overflow=settings.DB_MAX_OVERFLOW,
-    pool_pre_ping=True,
-    pool_recycle=3600,
+    pool_size=settings.db_pool_size_per_worker,
+    max_overflow=settings.db_max_overflow_per_worker,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+    connect_args={
+        "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        "timeout": settings.DB_CONNECT_TIMEOUT,
+        "command_timeout": settings.DB_COMMAND_TIMEOUT,
+        "server_settings": {
+            "application_name": "ai_planet",
+            # Keepalive traffic stops idle pooled connections being silently
+            # dropped by NATs and load balancers, and detects dead peers
+            "tcp_keepalives_idle": str(settings.DB_TCP_KEEPALIVE_IDLE),
+            "tcp_keepalives_interval": "10",
+            "tcp_keepalives_count": "3",
+            # JIT compilation costs more than it saves on short OLTP queries
+            "jit": "off",
+        },
+    },
 )
 
 # Create async session factory
@@ -28,9 +47,6 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
-# Create declarative base
-Base = declarative_base()
-
 # Naming convention for constraints
 convention = {
     "ix": "ix_%(column_0_label)s",
@@ -40,17 +56,29 @@ convention = {
     "pk": "pk_%(table_name)s"
 }
 
-Base.metadata = MetaData(naming_convention=convention)
+# Declarative base (SQLAlchemy 2.0 style)
+class Base(DeclarativeBase):
+    metadata = MetaData(naming_convention=convention)
+
+
+# How long a database health probe result is reused
+DB_HEALTH_CACHE_SECONDS = 5
+
+# HNSW candidates considered per requested row. pgvector applies WHERE filters
+# (owner, documents) after the index scan, which by default keeps only 40 candidates
+HNSW_EF_SEARCH_PER_RESULT = 20
+HNSW_EF_SEARCH_MIN = 200
+HNSW_EF_SEARCH_MAX = 1000  # pgvector's upper bound
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    Dependency to get database session
+    Dependency to get database session.
+    Handlers commit their own writes; read-only requests never send a COMMIT.
     """
     async with AsyncSessionLocal() as session:
         try:
             yield session
-            await session.commit()
         except Exception:
             await session.rollback()
             raise
@@ -58,6 +86,44 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+async def fetch_all_concurrently(*statements, max_concurrency: int = 4) -> List[list]:
+    """
+    Run independent read-only statements concurrently, each on its own pooled session.
+    Results are returned in the same order as the statements.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def fetch(statement):
+        async with semaphore:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(statement)
+                return result.all()
+    
+    return await asyncio.gather(*(fetch(statement) for statement in statements))
+
+
+async def widen_hnsw_search(session: AsyncSession, limit: int):
+    """
+    Raise hnsw.ef_search for the rest of the session's transaction so filtered
+    nearest-neighbour queries still find limit rows
+    """
+    ef_search = min(max(limit * HNSW_EF_SEARCH_PER_RESULT, HNSW_EF_SEARCH_MIN), HNSW_EF_SEARCH_MAX)
+    # set_config(..., true) is SET LOCAL with a bind parameter
+    await session.execute(select(func.set_config("hnsw.ef_search", str(ef_search), True)))
+
+
+async def warm_up_pool(connections: int = settings.db_pool_size_per_worker):
+    """
+    Open pooled connections up front so the first requests don't pay for connection setup
+    """
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    
+    # Holding them concurrently forces distinct connections into the pool
+    await asyncio.gather(*(ping() for _ in range(connections)))
+
+
 async def create_tables():
     """
     Create database tables
@@ -74,14 +140,49 @@ async def drop_tables():
         await conn.run_sync(Base.metadata.drop_all)
 
 
-async def check_db_connection():
+# Arbitrary application-wide advisory lock key held while the analytics views are refreshed
+ANALYTICS_REFRESH_LOCK_ID = 720_001
+
+
+async def refresh_analytics_views() -> bool:
+    """
+    Recompute the analytics materialized views without blocking readers.
+    Every app worker runs the refresh loop, so only the one that takes the
+    advisory lock refreshes; the rest skip this round. Returns whether it ran.
+    """
+    from app.models.orm_models import ANALYTICS_VIEWS
+    
+    async with engine.begin() as conn:
+        # Transaction-scoped, so it is released with the commit
+        locked = (await conn.execute(
+            select(func.pg_try_advisory_xact_lock(ANALYTICS_REFRESH_LOCK_ID))
+        )).scalar_one()
+        if not locked:
+            return False
+        
+        for view in ANALYTICS_VIEWS:
+            await conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view.name}"))
+    return True
+
+
+async def check_db_connection(force: bool = False) -> bool:
     """
-    Check database connection health
+    Check database connection health.
+    The result is reused for a few seconds so frequent health polling doesn't
+    probe the database on every request; force=True always probes.
     """
+    if not force:
+        cached_status = health_cache.get(DATABASE_HEALTH_KEY)
+        if cached_status is not None:
+            return cached_status
+    
     try:
-        async with engine.begin() as conn:
+        async with engine.connect() as conn:
             await conn.execute(text("SELECT 1"))
-        return True
+        db_healthy = True
     except Exception as e:
         print(f"Database connection failed: {e}")
-        return False
\ No newline at end of file
+        db_healthy = False
+    
+    health_cache.set(DATABASE_HEALTH_KEY, db_healthy, ttl_seconds=DB_HEALTH_CACHE_SECONDS)
+    return db_healthy
\ No newline at end of file
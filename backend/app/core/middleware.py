@@ -0,0 +1,53 @@
+"""
+ASGI middleware applied to the whole application
+"""
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse
+from starlette.status import HTTP_413_REQUEST_ENTITY_TOO_LARGE
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Server-sent event endpoints; gzip would buffer their frames until enough bytes build up
+EVENT_STREAM_PATH_SUFFIXES = ("/messages/stream",)
+
+
+class StreamingAwareGZipMiddleware:
+    """GZipMiddleware that leaves server-sent event streams uncompressed"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 500, compresslevel: int = 9):
+        self.app = app
+        self.gzip_app = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and scope["path"].endswith(EVENT_STREAM_PATH_SUFFIXES):
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip_app(scope, receive, send)
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject multipart uploads by their Content-Length header before any of the body
+    is read (dependencies run only after FastAPI has parsed the form). Chunked
+    uploads without the header are capped while the file is saved.
+    """
+
+    def __init__(self, app: ASGIApp, max_file_size: int, overhead_bytes: int = 0):
+        self.app = app
+        self.max_file_size = max_file_size
+        self.max_body_size = max_file_size + overhead_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            headers = Headers(scope=scope)
+            content_length = headers.get("content-length", "")
+            if headers.get("content-type", "").startswith("multipart/form-data") and \
+                    content_length.isdigit() and int(content_length) > self.max_body_size:
+                response = JSONResponse(
+                    status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    content={"detail": f"File size exceeds maximum allowed size of {self.max_file_size} bytes"}
+                )
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,53 @@
+"""
+Worker processes for CPU-bound document processing
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from app.core.config import settings
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _worker_count() -> int:
+    """Number of worker processes (DOCUMENT_WORKERS, or one per CPU)"""
+    return settings.DOCUMENT_WORKERS or os.cpu_count() or 1
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Shared process pool, created on first use"""
+    global _process_pool
+    if _process_pool is None:
+        # Workers start from a clean server process instead of forking this
+        # multi-threaded one (forkserver isn't available on Windows)
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _process_pool = ProcessPoolExecutor(
+            max_workers=_worker_count(),
+            mp_context=multiprocessing.get_context(start_method)
+        )
+    return _process_pool
+
+
+def _ready() -> bool:
+    """No-op job used to start a worker process"""
+    return True
+
+
+async def warm_up_process_pool():
+    """Start the worker processes now rather than on the first upload"""
+    # The pool only starts a process when a job is submitted and no worker is
+    # idle, so submit one job per worker at once
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    await asyncio.gather(*(loop.run_in_executor(pool, _ready) for _ in range(_worker_count())))
+
+
+def shutdown_process_pool():
+    """Stop the worker processes, if they were started"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
@@ -4,8 +4,10 @@ Main FastAPI application with PostgreSQL and Gemini AI integration
 """
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+import asyncio
 import os
 import warnings
 import logging
@@ -13,7 +15,9 @@ from pathlib import Path
 
 # Import configuration and database
 from app.core.config import settings
-from app.core.database import check_db_connection, create_tables
+from app.core.database import check_db_connection, create_tables, refresh_analytics_views, warm_up_pool
+from app.core.workers import warm_up_process_pool, shutdown_process_pool
+from app.core.middleware import StreamingAwareGZipMiddleware, UploadSizeLimitMiddleware
 
 # Import API routers
 from app.api.V1.auth import router as auth_router
@@ -34,10 +38,20 @@ logger = logging.getLogger(__name__)
 
 # Suppress warnings
 os.environ["ANONYMIZED_TELEMETRY"] = "False"
-os.environ["CHROMA_TELEMETRY_DISABLED"] = "True"
 warnings.filterwarnings("ignore", message=".*telemetry.*")
 warnings.filterwarnings("ignore", message=".*capture.*")
 
+async def refresh_analytics_periodically():
+    """
+    Keep the analytics materialized views fresh in the background
+    """
+    while True:
+        await asyncio.sleep(settings.ANALYTICS_REFRESH_SECONDS)
+        try:
+            await refresh_analytics_views()
+        except Exception as e:
+            logger.error(f"Analytics view refresh failed: {e}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -48,8 +62,10 @@ async def lifespan(app: FastAPI):
     
     # Check database connection
     logger.info("🔍 Checking database connection...")
-    if await check_db_connection():
+    if await check_db_connection(force=True):
         logger.info("✅ Database connection successful")
+        await warm_up_pool()
+        logger.info(f"🔌 Warmed {settings.db_pool_size_per_worker} pooled database connections")
     else:
         logger.error("❌ Database connection failed")
         raise HTTPException(status_code=500, detail="Database connection failed")
@@ -59,12 +75,21 @@ async def lifespan(app: FastAPI):
     upload_dir.mkdir(parents=True, exist_ok=True)
     logger.info(f"📁 Upload directory: {upload_dir}")
     
+    # Start the PDF parsing workers before the first upload needs them
+    await warm_up_process_pool()
+    logger.info("⚙️ Document processing workers started")
+    
+    # Refresh analytics rollups out-of-band
+    analytics_refresh_task = asyncio.create_task(refresh_analytics_periodically())
+    
     logger.info("✅ Application startup complete")
     
     yield
     
     # Shutdown
     logger.info("👋 Shutting down AI Planet application...")
+    analytics_refresh_task.cancel()
+    shutdown_process_pool()
 
 # Create FastAPI app with lifespan
 app = FastAPI(
@@ -72,6 +97,8 @@ app = FastAPI(
     version=settings.APP_VERSION,
     description="Full-stack AI-powered document processing and workflow automation platform",
     lifespan=lifespan,
+    # orjson encodes responses several times faster than the stdlib json encoder
+    default_response_class=ORJSONResponse,
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json"
@@ -86,6 +113,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses (workflow graphs, search results); small bodies aren't worth it.
+# Chat token streams are skipped so each event reaches the client as it is produced
+app.add_middleware(StreamingAwareGZipMiddleware, minimum_size=1024)
+
+# Room for multipart boundaries and form fields around the uploaded file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Checked in plain ASGI, so streamed responses pass through untouched
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_file_size=settings.MAX_FILE_SIZE,
+    overhead_bytes=MULTIPART_OVERHEAD_BYTES
+)
+
 # Mount static files
 static_dir = Path("static")
 if static_dir.exists():
@@ -1,19 +1,32 @@
 """
 SQLAlchemy ORM Models for PostgreSQL Database
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, JSON, LargeBinary
-from sqlalchemy.dialects.postgresql import UUID, ARRAY
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey
+from sqlalchemy import DDL, BigInteger, Computed, Date, Index, event, table, column, text, update
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB, TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
+from pgvector.sqlalchemy import Vector
+import os
+import time
 import uuid
 from datetime import datetime
 from app.core.database import Base
 
+def uuid7() -> uuid.UUID:
+    """
+    Time-ordered UUID (RFC 9562 version 7): a 48-bit Unix millisecond timestamp
+    followed by random bits, so new keys land at the right edge of B-tree indexes
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76  # version 7
+    value = value & ~(0x3 << 62) | 0x2 << 62  # RFC 4122 variant
+    return uuid.UUID(int=value)
+
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     email = Column(String(255), unique=True, index=True, nullable=False)
     username = Column(String(100), unique=True, index=True, nullable=False)
     full_name = Column(String(255), nullable=True)
@@ -26,15 +39,46 @@ class User(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     last_login = Column(DateTime(timezone=True), nullable=True)
     
+    # Denormalized counters, kept in step with the owned rows on create/delete
+    document_count = Column(Integer, nullable=False, default=0, server_default="0")
+    workflow_count = Column(Integer, nullable=False, default=0, server_default="0")
+    chat_session_count = Column(Integer, nullable=False, default=0, server_default="0")
+    total_storage_bytes = Column(BigInteger, nullable=False, default=0, server_default="0")
+    
     # Relationships
     documents = relationship("Document", back_populates="owner", cascade="all, delete-orphan")
     workflows = relationship("Workflow", back_populates="owner", cascade="all, delete-orphan")
     chat_sessions = relationship("ChatSession", back_populates="user", cascade="all, delete-orphan")
     
+def user_counter_update(user_id, **deltas):
+    """UPDATE that atomically adjusts a user's counters, e.g. document_count=1"""
+    return (
+        update(User)
+        .where(User.id == user_id)
+        .values({name: getattr(User, name) + delta for name, delta in deltas.items()})
+    )
+
+# Text indexed for full-text document search
+DOCUMENT_TSV_EXPRESSION = "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(content, ''))"
+
 class Document(Base):
     __tablename__ = "documents"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    __table_args__ = (
+        # Per-owner listings and analytics, newest first
+        Index("ix_documents_owner_created", "owner_id", "created_at"),
+        # Per-owner daily rollups (UTC days; AT TIME ZONE keeps the expression immutable)
+        Index("ix_documents_owner_day", "owner_id", text("date_trunc('day', created_at AT TIME ZONE 'UTC')")),
+        # Full-text search over title and content
+        Index("ix_documents_content_tsv", "content_tsv", postgresql_using="gin"),
+        # Substring and fuzzy title matches for search suggestions
+        Index(
+            "ix_documents_title_trgm", "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"}
+        ),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     title = Column(String(255), nullable=False)
     filename = Column(String(255), nullable=False)
     file_path = Column(String(500), nullable=False)
@@ -50,10 +94,16 @@ class Document(Base):
     
     # Analysis results
     summary = Column(Text, nullable=True)
-    topics = Column(JSON, nullable=True)
-    entities = Column(JSON, nullable=True)
-    insights = Column(JSON, nullable=True)
-    doc_metadata = Column(JSON, nullable=True)
+    topics = Column(JSONB, nullable=True)
+    entities = Column(JSONB, nullable=True)
+    insights = Column(JSONB, nullable=True)
+    doc_metadata = Column(JSONB, nullable=True)
+    
+    # Search vector kept up to date by Postgres; never loaded with the document
+    content_tsv = deferred(Column(
+        TSVECTOR,
+        Computed(DOCUMENT_TSV_EXPRESSION, persisted=True)
+    ))
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -68,21 +118,34 @@ class Document(Base):
     chunks = relationship("DocumentChunk", back_populates="document", cascade="all, delete-orphan")
     workflow_documents = relationship("WorkflowDocument", back_populates="document")
 
+# Gemini embeddings are padded to this size (see GeminiService.generate_embeddings)
+EMBEDDING_DIMENSION = 1536
+
 class DocumentChunk(Base):
     __tablename__ = "document_chunks"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    __table_args__ = (
+        # Chunk lookups and cascading deletes by document
+        Index("ix_document_chunks_document_id", "document_id"),
+        # Approximate nearest-neighbour search on cosine distance
+        Index(
+            "ix_document_chunks_embedding_hnsw", "embedding",
+            postgresql_using="hnsw",
+            postgresql_ops={"embedding": "vector_cosine_ops"}
+        ),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     content = Column(Text, nullable=False)
     chunk_index = Column(Integer, nullable=False)
     start_char = Column(Integer, nullable=True)
     end_char = Column(Integer, nullable=True)
     
     # Embeddings
-    embedding = Column(ARRAY(Float), nullable=True)
+    embedding = Column(Vector(EMBEDDING_DIMENSION), nullable=True)
     embedding_model = Column(String(100), nullable=True)
     
     # Metadata
-    chunk_metadata = Column(JSON, nullable=True)
+    chunk_metadata = Column(JSONB, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Foreign keys
@@ -93,15 +156,19 @@ class DocumentChunk(Base):
 
 class Workflow(Base):
     __tablename__ = "workflows"
+    __table_args__ = (
+        # Owner-scoped lookups (id + owner_id) and per-owner listings
+        Index("ix_workflows_owner_id", "owner_id", "id"),
+    )
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     name = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
     
     # Workflow configuration
-    config = Column(JSON, nullable=True)
-    nodes = Column(JSON, nullable=True)
-    edges = Column(JSON, nullable=True)
+    config = Column(JSONB, nullable=True)
+    nodes = Column(JSONB, nullable=True)
+    edges = Column(JSONB, nullable=True)
     
     # Status and execution
     status = Column(String(50), default="draft")  # draft, active, inactive
@@ -122,8 +189,14 @@ class Workflow(Base):
 
 class WorkflowDocument(Base):
     __tablename__ = "workflow_documents"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    __table_args__ = (
+        # Link lookups from either side; also serve the foreign key checks
+        # when a workflow or document is deleted
+        Index("ix_workflow_documents_workflow_id", "workflow_id"),
+        Index("ix_workflow_documents_document_id", "document_id"),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     added_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Foreign keys
@@ -136,11 +209,15 @@ class WorkflowDocument(Base):
 
 class WorkflowExecution(Base):
     __tablename__ = "workflow_executions"
+    __table_args__ = (
+        # Execution history per workflow, and clearing it when the workflow is deleted
+        Index("ix_workflow_executions_workflow_id", "workflow_id"),
+    )
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     status = Column(String(50), default="running")  # running, completed, failed
-    input_data = Column(JSON, nullable=True)
-    output_data = Column(JSON, nullable=True)
+    input_data = Column(JSONB, nullable=True)
+    output_data = Column(JSONB, nullable=True)
     error_message = Column(Text, nullable=True)
     
     # Execution metrics
@@ -159,14 +236,21 @@ class WorkflowExecution(Base):
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    __table_args__ = (
+        # Session list is ordered by most recently updated
+        Index("ix_chat_sessions_user_updated", "user_id", text("updated_at DESC")),
+    )
+    # Return server-generated timestamps via RETURNING on UPDATE as well as INSERT
+    __mapper_args__ = {"eager_defaults": True}
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     title = Column(String(255), nullable=False, default="New Chat")
     
     # Session configuration
     context_documents = Column(ARRAY(UUID(as_uuid=True)), nullable=True)
     system_prompt = Column(Text, nullable=True)
-    model_config = Column(JSON, nullable=True)
+    # Named model_config in the database; the attribute avoids Pydantic's reserved name
+    chat_model_config = Column("model_config", JSONB, nullable=True)
     
     # Session state
     is_active = Column(Boolean, default=True)
@@ -186,8 +270,14 @@ class ChatSession(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    __table_args__ = (
+        # Message history for a session in order
+        Index("ix_chat_messages_session_created", "session_id", "created_at"),
+        # System-wide "messages today" count
+        Index("ix_chat_messages_created", "created_at"),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     role = Column(String(20), nullable=False)  # user, assistant, system
     content = Column(Text, nullable=False)
     
@@ -197,8 +287,8 @@ class ChatMessage(Base):
     model_used = Column(String(100), nullable=True)
     
     # Context information
-    context_used = Column(JSON, nullable=True)
-    sources = Column(JSON, nullable=True)
+    context_used = Column(JSONB, nullable=True)
+    sources = Column(JSONB, nullable=True)
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -211,8 +301,12 @@ class ChatMessage(Base):
 
 class APIKey(Base):
     __tablename__ = "api_keys"
+    __table_args__ = (
+        # Per-user key lookups and account deletion
+        Index("ix_api_keys_user_id", "user_id"),
+    )
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     name = Column(String(255), nullable=False)
     key_hash = Column(String(255), nullable=False)
     provider = Column(String(50), nullable=False)  # gemini, openai, etc.
@@ -232,9 +326,9 @@ class APIKey(Base):
 class SystemSettings(Base):
     __tablename__ = "system_settings"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     key = Column(String(100), unique=True, nullable=False)
-    value = Column(JSON, nullable=True)
+    value = Column(JSONB, nullable=True)
     description = Column(Text, nullable=True)
     
     # Timestamps
@@ -249,3 +343,64 @@ class ChatLog(Base):
     user_query = Column(Text, nullable=False)
     response = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Analytics rollups - materialized views refreshed out-of-band (see refresh_analytics_views)
+user_daily_doc_uploads = table(
+    "mv_user_daily_doc_uploads",
+    column("user_id", UUID(as_uuid=True)),
+    column("date", Date),
+    column("document_count", BigInteger),
+    column("total_size", BigInteger),
+    column("refreshed_at", DateTime(timezone=True)),
+)
+
+user_daily_messages = table(
+    "mv_user_daily_messages",
+    column("user_id", UUID(as_uuid=True)),
+    column("date", Date),
+    column("message_count", BigInteger),
+    column("refreshed_at", DateTime(timezone=True)),
+)
+
+ANALYTICS_VIEWS = [user_daily_doc_uploads, user_daily_messages]
+
+_ANALYTICS_VIEW_QUERIES = {
+    "mv_user_daily_doc_uploads": """
+        SELECT owner_id AS user_id,
+               CAST(date_trunc('day', created_at AT TIME ZONE 'UTC') AS date) AS date,
+               COUNT(id) AS document_count,
+               COALESCE(SUM(file_size), 0) AS total_size,
+               now() AS refreshed_at
+        FROM documents
+        GROUP BY owner_id, date_trunc('day', created_at AT TIME ZONE 'UTC')
+    """,
+    "mv_user_daily_messages": """
+        SELECT chat_sessions.user_id AS user_id,
+               CAST(date_trunc('day', chat_messages.created_at AT TIME ZONE 'UTC') AS date) AS date,
+               COUNT(chat_messages.id) AS message_count,
+               now() AS refreshed_at
+        FROM chat_messages
+        JOIN chat_sessions ON chat_messages.session_id = chat_sessions.id
+        GROUP BY chat_sessions.user_id, date_trunc('day', chat_messages.created_at AT TIME ZONE 'UTC')
+    """,
+}
+
+# pgvector provides the embedding column type and the HNSW index method,
+# pg_trgm the trigram operators behind the title index
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS vector"))
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+for _view_name, _view_query in _ANALYTICS_VIEW_QUERIES.items():
+    event.listen(
+        Base.metadata, "after_create",
+        DDL(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {_view_name} AS {_view_query} WITH DATA")
+    )
+    # REFRESH ... CONCURRENTLY requires a unique index on the view
+    event.listen(
+        Base.metadata, "after_create",
+        DDL(f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{_view_name}_user_date ON {_view_name} (user_id, date)")
+    )
+    event.listen(
+        Base.metadata, "before_drop",
+        DDL(f"DROP MATERIALIZED VIEW IF EXISTS {_view_name}")
+    )
@@ -1,24 +1,51 @@
 """
 Pydantic models for API request/response validation
 """
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import Optional, List, Dict, Any, Union
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, TypeAdapter
+from typing import Optional, List, Dict, Any, Union, Type, TypeVar, FrozenSet, get_args
+from datetime import datetime, timezone
+from functools import lru_cache
 from uuid import UUID
 import uuid
 
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+@lru_cache(maxsize=None)
+def _non_nullable_fields(model: Type[BaseModel]) -> FrozenSet[str]:
+    """Fields of model whose type doesn't admit None"""
+    return frozenset(
+        name for name, field in model.model_fields.items()
+        if field.annotation is not Any and type(None) not in get_args(field.annotation)
+    )
+
+def construct_from_row(model: Type[ModelT], row: Any) -> ModelT:
+    """Build a response model from a trusted ORM row without re-validating every field"""
+    values = {
+        name: getattr(row, field.validation_alias or name)
+        for name, field in model.model_fields.items()
+    }
+    # Nullable columns behind non-Optional fields (status strings, flags) still
+    # get full validation, so a NULL fails loudly instead of reaching the client
+    if any(values[name] is None for name in _non_nullable_fields(model)):
+        return model.model_validate(row, from_attributes=True)
+    return model.model_construct(**values)
+
+def utc_now() -> datetime:
+    """Current UTC time as a naive datetime, the format API timestamps have always used"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 # Base Models
 class BaseResponse(BaseModel):
     success: bool = True
     message: str = "Operation completed successfully"
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=utc_now)
 
 class ErrorResponse(BaseModel):
     success: bool = False
     message: str
     error_code: Optional[str] = None
     details: Optional[Dict[str, Any]] = None
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=utc_now)
 
 # User Models
 class UserBase(BaseModel):
@@ -50,6 +77,9 @@ class UserResponse(UserBase):
     created_at: datetime
     last_login: Optional[datetime] = None
 
+# Validates and serializes a batch of ORM users in one call each
+user_list_adapter = TypeAdapter(List[UserResponse])
+
 # Authentication Models
 class Token(BaseModel):
     access_token: str
@@ -88,12 +118,16 @@ class DocumentResponse(DocumentBase):
     topics: Optional[List[str]] = None
     entities: Optional[Dict[str, List[str]]] = None
     insights: Optional[List[str]] = None
-    metadata: Optional[Dict[str, Any]] = None
+    # Stored as doc_metadata; "metadata" on the ORM class is the declarative MetaData
+    metadata: Optional[Dict[str, Any]] = Field(default=None, validation_alias="doc_metadata")
     created_at: datetime
     updated_at: Optional[datetime] = None
     processed_at: Optional[datetime] = None
     owner_id: UUID
 
+# Validates a whole page of ORM documents in one call
+document_list_adapter = TypeAdapter(List[DocumentResponse])
+
 class DocumentUploadResponse(BaseResponse):
     document: DocumentResponse
 
@@ -102,6 +136,7 @@ class DocumentListResponse(BaseResponse):
     total: int
     page: int
     per_page: int
+    has_more: bool = False
 
 # Document Analysis Models
 class DocumentAnalysisRequest(BaseModel):
@@ -159,8 +194,23 @@ class WorkflowResponse(WorkflowBase):
     updated_at: Optional[datetime] = None
     owner_id: UUID
 
+class WorkflowSummaryResponse(WorkflowBase):
+    """Workflow listing entry; the graph and config are only returned for a single workflow"""
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: UUID
+    status: str
+    execution_count: int
+    last_executed: Optional[datetime] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    owner_id: UUID
+
+# Validates a whole list of ORM workflows in one call
+workflow_list_adapter = TypeAdapter(List[WorkflowSummaryResponse])
+
 class WorkflowListResponse(BaseResponse):
-    workflows: List[WorkflowResponse]
+    workflows: List[WorkflowSummaryResponse]
     total: int
 
 class WorkflowExecutionRequest(BaseModel):
@@ -256,7 +306,7 @@ class FileUploadRequest(BaseModel):
 class HealthCheckResponse(BaseModel):
     status: str = "healthy"
     version: str
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=utc_now)
     services: Dict[str, str]
     uptime_seconds: float
 
@@ -1,8 +1,10 @@
 from app.services.gemini_service import gemini_service
 from app.core.config import settings
+from app.core.cache import embedding_cache, text_key
 import logging
 import hashlib
-from typing import List, Union
+import numpy as np
+from typing import Dict, List, Optional, Union
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -28,58 +30,60 @@ class EmbeddingService:
     
     async def create_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Create embeddings for multiple texts"""
-        try:
-            if self.provider == "gemini":
-                return await gemini_service.generate_embeddings(texts)
-            else:
-                return [self._create_dummy_embedding(text) for text in texts]
-        except Exception as e:
-            logger.error(f"Batch embedding creation failed: {e}")
-            return [self._create_dummy_embedding(text) for text in texts]
+        if self.provider == "gemini":
+            return await self._create_gemini_embeddings(texts)
+        return [self._create_dummy_embedding(text) for text in texts]
     
     async def _create_gemini_embedding(self, text: str) -> List[float]:
         """Create embedding using Gemini service"""
-        try:
-            embeddings = await gemini_service.generate_embeddings([text])
-            return embeddings[0] if embeddings else self._create_dummy_embedding(text)
-        except Exception as e:
-            logger.error(f"Gemini embedding failed: {e}")
-            return self._create_dummy_embedding(text)
+        embeddings = await self._create_gemini_embeddings([text])
+        return embeddings[0]
+    
+    async def _create_gemini_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Create embeddings using Gemini service, only requesting texts not already cached"""
+        keys = [text_key(text) for text in texts]
+        embeddings: List[Optional[List[float]]] = []
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            cached_embedding = embedding_cache.get(key)
+            if cached_embedding is not None:
+                embeddings.append(cached_embedding.tolist())
+            else:
+                embeddings.append(None)
+                # Repeated texts within the batch are requested once
+                missing.setdefault(key, text)
+        
+        if missing:
+            try:
+                fresh = await gemini_service.generate_embeddings(list(missing.values()))
+                fresh_by_key = dict(zip(missing, fresh))
+                # Only real embeddings are cached, never the dummy fallback
+                for key, embedding in fresh_by_key.items():
+                    embedding_cache.set(key, np.array(embedding))
+            except Exception as e:
+                logger.error(f"Gemini embedding failed: {e}")
+                fresh_by_key = {}
+            
+            for i, (key, text) in enumerate(zip(keys, texts)):
+                if embeddings[i] is None:
+                    embedding = fresh_by_key.get(key)
+                    embeddings[i] = embedding if embedding is not None else self._create_dummy_embedding(text)
+        
+        return embeddings
     
     def _create_dummy_embedding(self, text: str, dimension: int = 1536) -> List[float]:
         """Create a dummy embedding based on text hash for testing purposes"""
         # Create a deterministic embedding based on text hash
-        text_hash = hashlib.md5(text.encode()).hexdigest()
+        text_hash = hashlib.md5(text.encode()).digest()
         
-        # Convert hash to numbers and normalize to create embedding-like vector
-        embedding = []
-        for i in range(0, dimension, 8):  # Process 8 chars at a time
-            chunk = text_hash[i % len(text_hash):(i % len(text_hash)) + 8]
-            if len(chunk) < 8:
-                chunk = chunk.ljust(8, '0')
-            
-            # Convert hex to float and normalize
-            try:
-                val = int(chunk, 16) / (16**8)  # Normalize to 0-1
-                embedding.append((val - 0.5) * 2)  # Center around 0, range -1 to 1
-            except ValueError:
-                embedding.append(0.0)
-        
-        # Ensure we have exactly the right dimension
-        while len(embedding) < dimension:
-            embedding.append(0.0)
+        # One value per 8 hex chars (4 digest bytes, big-endian), cycling through the hash
+        # for the first dimension/8 slots and zero after; normalized to -1..1
+        lanes = np.frombuffer(text_hash, dtype=">u4") / float(16**8)
+        embedding = np.zeros(dimension)
+        filled = min(-(-dimension // 8), dimension)
+        embedding[:filled] = (np.resize(lanes, filled) - 0.5) * 2
         
-        return embedding[:dimension]
+        return embedding.tolist()
 
 # Global instance
 embedding_service = EmbeddingService()
-
-# Legacy functions for backward compatibility
-def create_embedding(text: str):
-    """Legacy sync function - use embedding_service.create_embedding instead"""
-    import asyncio
-    return asyncio.run(embedding_service.create_embedding(text))
-
-def create_gemini_embedding(text: str):
-    """Legacy function - use embedding_service instead"""
-    return create_embedding(text)
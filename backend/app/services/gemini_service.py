@@ -6,12 +6,18 @@ import google.generativeai as genai
 import asyncio
 import aiohttp
 import numpy as np
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any
 from app.core.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Most texts the embedding API accepts in one batch request
+EMBEDDING_BATCH_SIZE = 100
+# Batch requests allowed in flight at once, across all callers
+EMBEDDING_CONCURRENCY = 4
+_embedding_semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+
 class GeminiService:
     def __init__(self):
         if not settings.GEMINI_API_KEY or settings.GEMINI_API_KEY == "your-gemini-api-key-here":
@@ -89,36 +95,69 @@ class GeminiService:
             logger.error(f"Error generating text with Gemini: {e}")
             return f"AI service error: {str(e)}. Please check the API configuration."
 
+    async def stream_text(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Generate text using Gemini AI, yielding chunks as they are produced
+        """
+        if not self._api_configured:
+            yield "AI service is not configured. Please add your Gemini API key to the backend .env file to enable AI responses."
+            return
+        
+        try:
+            response = await self.text_model.generate_content_async(
+                prompt,
+                generation_config=self.generation_config,
+                safety_settings=self.safety_settings,
+                stream=True
+            )
+            
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+                    
+        except Exception as e:
+            logger.error(f"Error streaming text with Gemini: {e}")
+            yield f"AI service error: {str(e)}. Please check the API configuration."
+
     async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
         Generate embeddings for a list of texts using Gemini
         Note: Gemini embeddings are 768-dimensional, we'll pad to 1536 for compatibility
         """
-        try:
-            embeddings = []
-            
-            for text in texts:
-                # Generate embedding using Gemini
-                result = await asyncio.get_event_loop().run_in_executor(
+        async def embed_batch(batch: List[str]) -> List[List[float]]:
+            # embed_content takes a list and sends it as one batch request
+            async with _embedding_semaphore:
+                result = await asyncio.get_running_loop().run_in_executor(
                     None,
                     lambda: genai.embed_content(
                         model=self.embedding_model,
-                        content=text,
+                        content=batch,
                         task_type="retrieval_document"
                     )
                 )
-                
-                embedding = result['embedding']
-                
-                # Pad embedding from 768 to 1536 dimensions for compatibility
-                if len(embedding) == 768:
-                    # Pad with zeros to reach 1536 dimensions
-                    padded_embedding = embedding + [0.0] * (1536 - 768)
-                    embeddings.append(padded_embedding)
-                else:
-                    embeddings.append(embedding)
+            return result['embedding']
+        
+        if not texts:
+            return []
+        
+        try:
+            # Batches are independent, so several are requested at once; gather keeps their order
+            batch_results = await asyncio.gather(*(
+                embed_batch(texts[batch_start:batch_start + EMBEDDING_BATCH_SIZE])
+                for batch_start in range(0, len(texts), EMBEDDING_BATCH_SIZE)
+            ))
+            embeddings = np.array(
+                [embedding for batch_embeddings in batch_results for embedding in batch_embeddings]
+            )
+            
+            # Pad embeddings from 768 to 1536 dimensions for compatibility by
+            # writing them into a preallocated zero matrix
+            if embeddings.shape[1] < 1536:
+                padded = np.zeros((len(embeddings), 1536))
+                padded[:, :embeddings.shape[1]] = embeddings
+                embeddings = padded
             
-            return embeddings
+            return embeddings.tolist()
             
         except Exception as e:
             logger.error(f"Error generating embeddings with Gemini: {e}")
@@ -177,18 +216,14 @@ class GeminiService:
             logger.error(f"Error analyzing document with Gemini: {e}")
             raise Exception(f"Failed to analyze document: {str(e)}")
 
-    async def chat_with_context(self, question: str, context_documents: List[str]) -> str:
+    def build_context_prompt(self, question: str, context_documents: List[str]) -> str:
         """
-        Answer questions based on provided document context
+        Build the prompt for answering a question from document context
         """
-        if not self._api_configured:
-            return "AI service is not configured. Please add your Gemini API key to the backend .env file to enable AI responses with document context."
+        # Combine context documents
+        combined_context = "\n\n".join(context_documents)
         
-        try:
-            # Combine context documents
-            combined_context = "\n\n".join(context_documents)
-            
-            chat_prompt = f"""
+        return f"""
             You are an AI assistant helping users understand and analyze documents. 
             Use the provided context to answer the user's question accurately and helpfully.
             
@@ -201,8 +236,16 @@ class GeminiService:
             directly available in the context, let the user know and provide the best 
             possible guidance based on the available information.
             """
-            
-            response = await self.generate_text(chat_prompt)
+
+    async def chat_with_context(self, question: str, context_documents: List[str]) -> str:
+        """
+        Answer questions based on provided document context
+        """
+        if not self._api_configured:
+            return "AI service is not configured. Please add your Gemini API key to the backend .env file to enable AI responses with document context."
+        
+        try:
+            response = await self.generate_text(self.build_context_prompt(question, context_documents))
             return response
             
         except Exception as e:
@@ -3,6 +3,7 @@ Advanced Workflow Engine for No-Code/Low-Code workflow execution
 """
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+import uuid
 from typing import List, Dict, Any, Optional
 import logging
 import asyncio
@@ -10,8 +11,9 @@ from datetime import datetime
 
 from app.services.gemini_service import gemini_service
 from app.services.embeddings_service import embedding_service
-from app.models.orm_models import Document, DocumentChunk, User
+from app.models.orm_models import Document, DocumentChunk
 from app.core.config import settings
+from app.core.database import widen_hnsw_search
 
 logger = logging.getLogger(__name__)
 
@@ -21,9 +23,9 @@ class WorkflowEngine:
     with the 4 core components: UserQuery, KnowledgeBase, LLMEngine, Output
     """
     
-    def __init__(self, db: AsyncSession, user: User):
+    def __init__(self, db: AsyncSession, user_id: uuid.UUID):
         self.db = db
-        self.user = user
+        self.user_id = user_id
         self.execution_context = {}
         
     async def execute_workflow(
@@ -190,37 +192,35 @@ class WorkflowEngine:
             # Generate query embedding
             query_embedding = await embedding_service.create_embedding(user_query)
             
-            # Search for relevant document chunks
-            query = select(DocumentChunk, Document).join(
+            distance = DocumentChunk.embedding.cosine_distance(query_embedding)
+            query = select(DocumentChunk.content, Document.title, Document.id, distance.label("distance")).join(
                 Document, DocumentChunk.document_id == Document.id
             ).where(
-                Document.owner_id == self.user.id,
+                Document.owner_id == self.user_id,
                 DocumentChunk.embedding.isnot(None)
             )
             
-            # Filter by specific documents if specified
             if document_ids:
-                query = query.where(Document.id.in_(document_ids))
-            
-            result = await self.db.execute(query)
-            chunks_with_docs = result.all()
+                # Rank the selected documents' chunks exactly; the HNSW index's
+                # candidates would mostly be discarded by this filter
+                query = query.where(Document.id.in_(document_ids)).order_by(distance + 0)
+            else:
+                # Nearest chunks by cosine distance, served by the HNSW index
+                await widen_hnsw_search(self.db, max_results)
+                query = query.order_by(distance)
             
-            # Calculate similarities and sort
-            relevant_chunks = []
-            for chunk, document in chunks_with_docs:
-                if chunk.embedding:
-                    similarity = self._calculate_similarity(query_embedding, chunk.embedding)
-                    if similarity >= similarity_threshold:
-                        relevant_chunks.append({
-                            "content": chunk.content,
-                            "similarity": similarity,
-                            "document_title": document.title,
-                            "document_id": str(document.id)
-                        })
+            result = await self.db.execute(query.limit(max_results))
             
-            # Sort by similarity and limit results
-            relevant_chunks.sort(key=lambda x: x["similarity"], reverse=True)
-            relevant_chunks = relevant_chunks[:max_results]
+            relevant_chunks = [
+                {
+                    "content": row.content,
+                    "similarity": 1 - row.distance,
+                    "document_title": row.title,
+                    "document_id": str(row.id)
+                }
+                for row in result.all()
+                if 1 - row.distance >= similarity_threshold
+            ]
             
             # Prepare context
             context_content = [chunk["content"] for chunk in relevant_chunks]
@@ -347,28 +347,6 @@ class WorkflowEngine:
         logger.info(f"Output processed: Generated final response")
         return result
     
-    def _calculate_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """
-        Calculate cosine similarity between two vectors
-        """
-        try:
-            import numpy as np
-            
-            a = np.array(vec1)
-            b = np.array(vec2)
-            
-            dot_product = np.dot(a, b)
-            norm_a = np.linalg.norm(a)
-            norm_b = np.linalg.norm(b)
-            
-            if norm_a == 0 or norm_b == 0:
-                return 0.0
-            
-            similarity = dot_product / (norm_a * norm_b)
-            return float(similarity)
-        except Exception:
-            return 0.0
-
 # Legacy function for backward compatibility
 def run_workflow(workflow_definition: dict, user_query: str, custom_prompt: str = None):
     """
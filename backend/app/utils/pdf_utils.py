@@ -17,3 +17,15 @@ def extract_text_from_pdf_bytes(file_bytes: bytes) -> str:
         
     except Exception as e:
         return f"Error extracting text from PDF: {str(e)}"
+
+def extract_text_from_pdf_file(file_path: str) -> str:
+    """Extract text from a PDF file on disk using PyMuPDF"""
+    try:
+        doc = fitz.open(file_path)
+        text = [page.get_text() for page in doc]
+        
+        doc.close()
+        return "\n".join(text)
+        
+    except Exception as e:
+        return f"Error extracting text from PDF: {str(e)}"
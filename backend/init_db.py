@@ -22,7 +22,7 @@ async def init_database():
     
     # Check database connection
     print("🔍 Checking database connection...")
-    if not await check_db_connection():
+    if not await check_db_connection(force=True):
         print("❌ Database connection failed. Please check your DATABASE_URL in .env file")
         print(f"Current DATABASE_URL: {settings.DATABASE_URL}")
         print("\nMake sure PostgreSQL is running and credentials are correct.")
@@ -36,6 +36,21 @@ async def init_database():
         await create_tables()
         print("✅ All tables created successfully!")
         
+        # Bring counters on pre-existing users in line with their rows
+        await backfill_user_counters()
+        
+        # Convert float-array embeddings to pgvector before its index is built
+        await migrate_embeddings_to_vector()
+        
+        # Add the generated full-text search column before its index is built
+        await add_document_search_column()
+        
+        # Convert text JSON columns of older databases to binary JSONB
+        await migrate_json_to_jsonb()
+        
+        # create_all skips indexes on tables that already exist
+        await create_missing_indexes()
+        
         # Create default admin user if needed
         await create_default_data()
         
@@ -44,6 +59,131 @@ async def init_database():
         print(f"❌ Error creating tables: {e}")
         return False
 
+async def backfill_user_counters():
+    """
+    Add the denormalized user counter columns to older databases and recompute them
+    """
+    from sqlalchemy import text
+    from app.core.database import engine
+    
+    print("🔢 Backfilling user counters...")
+    
+    async with engine.begin() as conn:
+        for column_name, column_type in [
+            ("document_count", "INTEGER"),
+            ("workflow_count", "INTEGER"),
+            ("chat_session_count", "INTEGER"),
+            ("total_storage_bytes", "BIGINT"),
+        ]:
+            await conn.execute(text(
+                f"ALTER TABLE users ADD COLUMN IF NOT EXISTS {column_name} {column_type} NOT NULL DEFAULT 0"
+            ))
+        
+        await conn.execute(text("""
+            UPDATE users SET
+                document_count = (SELECT count(*) FROM documents WHERE documents.owner_id = users.id),
+                workflow_count = (SELECT count(*) FROM workflows WHERE workflows.owner_id = users.id),
+                chat_session_count = (SELECT count(*) FROM chat_sessions WHERE chat_sessions.user_id = users.id),
+                total_storage_bytes = (
+                    SELECT coalesce(sum(file_size), 0) FROM documents WHERE documents.owner_id = users.id
+                )
+        """))
+    
+    print("✅ User counters backfilled")
+
+async def migrate_embeddings_to_vector():
+    """
+    Convert the float-array embedding column of older databases to pgvector
+    """
+    from sqlalchemy import text
+    from app.core.database import engine
+    from app.models.orm_models import EMBEDDING_DIMENSION
+    
+    print("🧮 Migrating embeddings to pgvector...")
+    
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        column_type = (await conn.execute(text(
+            "SELECT udt_name FROM information_schema.columns "
+            "WHERE table_name = 'document_chunks' AND column_name = 'embedding'"
+        ))).scalar_one_or_none()
+        
+        if column_type != "vector":
+            # Embeddings of any other size can't be cast and have to be regenerated
+            await conn.execute(text(
+                f"UPDATE document_chunks SET embedding = NULL "
+                f"WHERE cardinality(embedding) <> {EMBEDDING_DIMENSION}"
+            ))
+            await conn.execute(text(
+                f"ALTER TABLE document_chunks ALTER COLUMN embedding "
+                f"TYPE vector({EMBEDDING_DIMENSION}) USING embedding::vector({EMBEDDING_DIMENSION})"
+            ))
+    
+    print("✅ Embeddings stored as pgvector")
+
+async def add_document_search_column():
+    """
+    Add the generated full-text search column to older databases
+    """
+    from sqlalchemy import text
+    from app.core.database import engine
+    from app.models.orm_models import DOCUMENT_TSV_EXPRESSION
+    
+    print("🔎 Adding document search column...")
+    
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.execute(text(
+            f"ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_tsv tsvector "
+            f"GENERATED ALWAYS AS ({DOCUMENT_TSV_EXPRESSION}) STORED"
+        ))
+    
+    print("✅ Document search column ready")
+
+async def migrate_json_to_jsonb():
+    """
+    Convert the JSON columns of older databases to JSONB
+    """
+    from sqlalchemy import text
+    from sqlalchemy.dialects.postgresql import JSONB
+    from app.core.database import engine
+    
+    print("🧾 Migrating JSON columns to JSONB...")
+    
+    async with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for column in table.columns:
+                if not isinstance(column.type, JSONB):
+                    continue
+                column_type = (await conn.execute(text(
+                    "SELECT udt_name FROM information_schema.columns "
+                    "WHERE table_name = :table AND column_name = :column"
+                ), {"table": table.name, "column": column.name})).scalar_one_or_none()
+                
+                if column_type == "json":
+                    await conn.execute(text(
+                        f"ALTER TABLE {table.name} ALTER COLUMN {column.name} "
+                        f"TYPE jsonb USING {column.name}::jsonb"
+                    ))
+    
+    print("✅ JSON columns stored as JSONB")
+
+async def create_missing_indexes():
+    """
+    Create any model-declared indexes that older databases don't have yet
+    """
+    from sqlalchemy.schema import CreateIndex
+    from app.core.database import engine
+    
+    print("🗂️  Creating missing indexes...")
+    
+    async with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                await conn.execute(CreateIndex(index, if_not_exists=True))
+    
+    print("✅ Indexes up to date")
+
 async def create_default_data():
     """
     Create default data for the application
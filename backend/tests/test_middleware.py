@@ -0,0 +1,75 @@
+"""
+Tests for the application-wide ASGI middleware
+"""
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.middleware import StreamingAwareGZipMiddleware, UploadSizeLimitMiddleware
+
+FRAMES = [f"data: {{\"type\": \"token\", \"content\": \"token {i} \"}}\n\n" for i in range(200)]
+
+
+async def event_stream(request):
+    async def frames():
+        for frame in FRAMES:
+            yield frame
+    return StreamingResponse(frames(), media_type="text/event-stream")
+
+
+async def large_json(request):
+    return JSONResponse({"items": ["x" * 100] * 100})
+
+
+async def upload(request):
+    body = await request.body()
+    return JSONResponse({"received": len(body)})
+
+
+def make_client() -> TestClient:
+    app = Starlette(routes=[
+        Route("/api/v1/chat/sessions/{session_id}/messages/stream", event_stream, methods=["POST"]),
+        Route("/api/v1/documents/", large_json),
+    ])
+    app.add_middleware(StreamingAwareGZipMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def test_event_stream_frames_are_not_gzipped():
+    client = make_client()
+    with client.stream(
+        "POST", "/api/v1/chat/sessions/abc/messages/stream",
+        headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "content-encoding" not in response.headers
+        body = b"".join(response.iter_raw()).decode()
+    assert body == "".join(FRAMES)
+
+
+def test_other_responses_are_still_gzipped():
+    client = make_client()
+    response = client.get("/api/v1/documents/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()["items"]) == 100
+
+
+def make_upload_client() -> TestClient:
+    app = Starlette(routes=[Route("/upload", upload, methods=["POST"])])
+    app.add_middleware(UploadSizeLimitMiddleware, max_file_size=1000, overhead_bytes=100)
+    return TestClient(app)
+
+
+def test_oversized_multipart_upload_is_rejected():
+    client = make_upload_client()
+    response = client.post("/upload", files={"file": ("big.txt", b"x" * 2000)})
+    assert response.status_code == 413
+    assert response.json()["detail"] == "File size exceeds maximum allowed size of 1000 bytes"
+
+
+def test_upload_within_limit_passes_through():
+    client = make_upload_client()
+    response = client.post("/upload", files={"file": ("small.txt", b"x" * 500)})
+    assert response.status_code == 200
+    assert response.json()["received"] > 500